@@ -0,0 +1,80 @@
+"""add book full text search
+
+Revision ID: 0293925a7347
+Revises: 68e1b938a269
+Create Date: 2026-10-18 12:26:53.184470
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0293925a7347'
+down_revision = '68e1b938a269'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            """
+            ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(author, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+            """
+        )
+        op.execute("CREATE INDEX ix_books_search_vector ON books USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            """
+            CREATE VIRTUAL TABLE books_fts USING fts5(
+                title, author, description,
+                content='books', content_rowid='id', tokenize='porter unicode61'
+            )
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+                INSERT INTO books_fts(rowid, title, author, description)
+                VALUES (new.id, new.title, new.author, new.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author, description)
+                VALUES ('delete', old.id, old.title, old.author, old.description);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER books_fts_au AFTER UPDATE OF title, author, description ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author, description)
+                VALUES ('delete', old.id, old.title, old.author, old.description);
+                INSERT INTO books_fts(rowid, title, author, description)
+                VALUES (new.id, new.title, new.author, new.description);
+            END
+            """
+        )
+        # Index the existing catalog
+        op.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_books_search_vector', table_name='books')
+        op.drop_column('books', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS books_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+        op.execute("DROP TABLE IF EXISTS books_fts")
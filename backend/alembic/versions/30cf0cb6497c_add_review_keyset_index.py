@@ -0,0 +1,24 @@
+"""add review keyset index
+
+Revision ID: 30cf0cb6497c
+Revises: 102167e0ade6
+Create Date: 2026-10-18 09:12:41.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '30cf0cb6497c'
+down_revision = '102167e0ade6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reviews_book_id_created_at_id', 'reviews', ['book_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_book_id_created_at_id', table_name='reviews')
@@ -0,0 +1,24 @@
+"""add books updated_at index
+
+Revision ID: 68e1b938a269
+Revises: 95c2bea97457
+Create Date: 2026-10-18 11:41:08.903215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '68e1b938a269'
+down_revision = '95c2bea97457'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_books_updated_at', 'books', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_updated_at', table_name='books')
@@ -0,0 +1,35 @@
+"""add book rating aggregates
+
+Revision ID: 95c2bea97457
+Revises: 30cf0cb6497c
+Create Date: 2026-10-18 10:03:27.114862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '95c2bea97457'
+down_revision = '30cf0cb6497c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('books', sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('books', sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+
+    # Backfill from existing reviews
+    op.execute(
+        """
+        UPDATE books SET
+            review_count = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.book_id = books.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'rating_sum')
+    op.drop_column('books', 'review_count')
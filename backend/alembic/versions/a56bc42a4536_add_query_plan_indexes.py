@@ -0,0 +1,30 @@
+"""add query plan indexes
+
+Revision ID: a56bc42a4536
+Revises: 0293925a7347
+Create Date: 2026-10-18 14:02:37.411862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a56bc42a4536'
+down_revision = '0293925a7347'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per-book review exports order by id
+    op.create_index('ix_reviews_book_id_id', 'reviews', ['book_id', 'id'], unique=False)
+    # Incremental book exports filter and order on (updated_at, id)
+    op.create_index('ix_books_updated_at_id', 'books', ['updated_at', 'id'], unique=False)
+    op.drop_index('ix_books_updated_at', table_name='books')
+
+
+def downgrade() -> None:
+    op.create_index('ix_books_updated_at', 'books', ['updated_at'], unique=False)
+    op.drop_index('ix_books_updated_at_id', table_name='books')
+    op.drop_index('ix_reviews_book_id_id', table_name='reviews')
@@ -0,0 +1,41 @@
+"""add book star histogram
+
+Revision ID: d41c7e9b2f06
+Revises: a56bc42a4536
+Create Date: 2026-10-18 16:41:09.528317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41c7e9b2f06'
+down_revision = 'a56bc42a4536'
+branch_labels = None
+depends_on = None
+
+STARS = range(1, 6)
+
+
+def upgrade() -> None:
+    for stars in STARS:
+        op.add_column('books', sa.Column(f'stars_{stars}', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from existing reviews; half stars round down
+    op.execute(
+        """
+        UPDATE books SET
+            stars_1 = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND rating < 2),
+            stars_2 = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND rating >= 2 AND rating < 3),
+            stars_3 = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND rating >= 3 AND rating < 4),
+            stars_4 = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND rating >= 4 AND rating < 5),
+            stars_5 = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id AND rating >= 5)
+        WHERE review_count > 0
+        """
+    )
+
+
+def downgrade() -> None:
+    for stars in reversed(STARS):
+        op.drop_column('books', f'stars_{stars}')
@@ -0,0 +1,133 @@
+import bisect
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select
+
+from app.config import settings
+from app.cache import on_event, publish_event
+from app.schemas.book import AutocompleteSuggestion
+
+# (normalized text, field, display text, book id); author entries have no book id
+Entry = Tuple[str, str, str, Optional[int]]
+
+AUTOCOMPLETE_EVENT = "autocomplete"
+# Batches larger than this are merged with one sort instead of per-entry inserts
+BISECT_INSERT_LIMIT = 32
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted array of title/author entries searched with bisect.
+    
+    Lookups are O(log n + k). Inserts are idempotent, so a worker can apply
+    its own broadcast again without creating duplicates.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: List[Entry] = []
+        self._authors = set()
+
+    def build(self, books: Iterable[Tuple[int, str, str]]):
+        """Replace the index with the given (id, title, author) rows"""
+        self._entries = []
+        self._authors = set()
+        self.add_many(books)
+
+    def add(self, book_id: int, title: str, author: str):
+        """Insert one book, keeping the array sorted"""
+        self.add_many([(book_id, title, author)])
+
+    def add_many(self, books: Iterable[Tuple[int, str, str]]):
+        """Insert many books, keeping the array sorted.
+        
+        A few entries are placed with bisect; larger batches are appended
+        and sorted, which Timsort merges as two runs in one linear pass
+        instead of shifting the array once per entry.
+        """
+        entries = self._new_entries(books)
+        if len(entries) <= BISECT_INSERT_LIMIT:
+            for entry in entries:
+                bisect.insort(self._entries, entry)
+        else:
+            entries.sort()
+            self._entries.extend(entries)
+            self._entries.sort()
+        self._authors.update(entry[0] for entry in entries if entry[1] == "author")
+
+    def _new_entries(self, books: Iterable[Tuple[int, str, str]]) -> List[Entry]:
+        """Entries of books not indexed yet, in input order, up to the free capacity"""
+        room = self.max_entries - len(self._entries)
+        entries: List[Entry] = []
+        authors = set()
+        for book_id, title, author in books:
+            if len(entries) >= room:
+                break
+            entry = (normalize(title), "title", title, book_id)
+            if not (self._entries and self._contains(entry)):
+                entries.append(entry)
+            author_key = normalize(author)
+            if author_key not in self._authors and author_key not in authors and len(entries) < room:
+                authors.add(author_key)
+                entries.append((author_key, "author", author, None))
+        return entries
+
+    def _contains(self, entry: Entry) -> bool:
+        position = bisect.bisect_left(self._entries, entry)
+        return position < len(self._entries) and self._entries[position] == entry
+
+    def search(self, prefix: str, limit: int = 10) -> List[Entry]:
+        """Entries whose normalized text starts with prefix, in sorted order"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        matches = []
+        position = bisect.bisect_left(self._entries, (prefix,))
+        while position < len(self._entries) and len(matches) < limit:
+            entry = self._entries[position]
+            if not entry[0].startswith(prefix):
+                break
+            matches.append(entry)
+            position += 1
+        return matches
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+autocomplete_index = PrefixIndex(settings.AUTOCOMPLETE_MAX_ENTRIES)
+
+
+def suggest(prefix: str, limit: int = 10) -> List[AutocompleteSuggestion]:
+    """Title and author suggestions from this worker's index; never touches the database"""
+    return [
+        AutocompleteSuggestion(text=text, field=field, book_id=book_id)
+        for _, field, text, book_id in autocomplete_index.search(prefix, limit)
+    ]
+
+
+async def build_autocomplete_index():
+    """Load every title and author into the index; run at startup"""
+    from app.database import AsyncSessionLocal
+    from app.models.book import Book
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(Book.id, Book.title, Book.author).execution_options(yield_per=10000)
+        )
+        autocomplete_index.build([tuple(row) async for row in result])
+
+
+async def add_to_autocomplete(books: List[Tuple[int, str, str]]):
+    """Index new books here and broadcast them to the other workers"""
+    _apply_autocomplete_event(books)
+    await publish_event(AUTOCOMPLETE_EVENT, books)
+
+
+def _apply_autocomplete_event(books: List[Tuple[int, str, str]]):
+    autocomplete_index.add_many(books)
+
+
+on_event(AUTOCOMPLETE_EVENT, _apply_autocomplete_event)
@@ -1,53 +1,431 @@
 import redis.asyncio as redis
+from redis.exceptions import WatchError
+import asyncio
 import json
-from typing import Any, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from app.config import settings
+from app.metrics import CACHE_OPERATIONS, time_cache
 
 redis_client: Optional[redis.Redis] = None
+# Same server without response decoding, for raw JSON and compressed bytes
+binary_client: Optional[redis.Redis] = None
+_invalidation_task: Optional[asyncio.Task] = None
+_inflight: Dict[str, asyncio.Future] = {}
+_event_handlers: Dict[str, Callable[[Any], None]] = {}
+
+
+class LocalCache:
+    """Size-bounded LRU cache with per-entry TTL, local to one worker process"""
+
+    def __init__(self, max_items: int, ttl: int):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TierStats:
+    """Hit/miss counters for one cache tier"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ITEMS, settings.LOCAL_CACHE_TTL)
+cache_stats = {"local": TierStats(), "redis": TierStats()}
 
 
 async def init_cache():
-    """Initialize Redis connection"""
-    global redis_client
+    """Initialize Redis connection and subscribe to invalidations"""
+    global redis_client, binary_client, _invalidation_task
     redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    binary_client = redis.from_url(settings.REDIS_URL)
+    local_cache.clear()
+    _invalidation_task = asyncio.create_task(_listen_for_invalidations())
+
+
+async def close_cache():
+    """Stop the invalidation listener and close the Redis connections"""
+    global redis_client, binary_client, _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
+    if redis_client is not None:
+        await redis_client.aclose()
+        redis_client = None
+    if binary_client is not None:
+        await binary_client.aclose()
+        binary_client = None
 
 
-async def get_cache(key: str) -> Optional[Any]:
-    """Get value from cache"""
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit ratios per cache tier"""
+    stats = {tier: tier_stats.as_dict() for tier, tier_stats in cache_stats.items()}
+    stats["local"]["size"] = len(local_cache)
+    return stats
+
+
+async def get_cache(key: str, raw: bool = False) -> Optional[Any]:
+    """Get value from cache; raw returns the stored bytes undecoded, e.g. JSON or gzip"""
+    value = local_cache.get(key)
+    if value is not None:
+        cache_stats["local"].hits += 1
+        return value
+    cache_stats["local"].misses += 1
+
     try:
-        if redis_client is None:
+        client = binary_client if raw else redis_client
+        if client is None:
             return None
         
-        value = await redis_client.get(key)
+        with time_cache("get"):
+            value = await client.get(key)
         if value:
-            return json.loads(value)
+            cache_stats["redis"].hits += 1
+            CACHE_OPERATIONS.labels("get", "hit").inc()
+            if not raw:
+                value = json.loads(value)
+            local_cache.set(key, value)
+            return value
+        cache_stats["redis"].misses += 1
+        CACHE_OPERATIONS.labels("get", "miss").inc()
         return None
     except Exception as e:
         print(f"Cache get error: {e}")
         return None
 
 
-async def set_cache(key: str, value: Any, ttl: int = settings.CACHE_TTL) -> bool:
-    """Set value in cache"""
+async def set_cache(key: str, value: Any, ttl: int = settings.CACHE_TTL, raw: bool = False) -> bool:
+    """Set value in cache; raw stores already serialized bytes as-is"""
+    local_cache.set(key, value, ttl)
     try:
         if redis_client is None:
             return False
         
-        await redis_client.setex(key, ttl, json.dumps(value, default=str))
+        with time_cache("set", "ok"):
+            await redis_client.setex(key, ttl, value if raw else json.dumps(value, default=str))
         return True
     except Exception as e:
         print(f"Cache set error: {e}")
         return False
 
 
+async def get_cache_many(keys: List[str]) -> List[Optional[Any]]:
+    """Get several values, in key order, with one MGET for those not held locally"""
+    values: List[Optional[Any]] = [local_cache.get(key) for key in keys]
+    missing = [i for i, value in enumerate(values) if value is None]
+    cache_stats["local"].hits += len(keys) - len(missing)
+    cache_stats["local"].misses += len(missing)
+    try:
+        if redis_client is None or not missing:
+            return values
+        
+        with time_cache("mget"):
+            found = await redis_client.mget([keys[i] for i in missing])
+        hits = 0
+        for i, value in zip(missing, found):
+            if value:
+                values[i] = json.loads(value)
+                local_cache.set(keys[i], values[i])
+                hits += 1
+        cache_stats["redis"].hits += hits
+        cache_stats["redis"].misses += len(missing) - hits
+        CACHE_OPERATIONS.labels("mget", "hit").inc(hits)
+        CACHE_OPERATIONS.labels("mget", "miss").inc(len(missing) - hits)
+        return values
+    except Exception as e:
+        print(f"Cache get error: {e}")
+        return values
+
+
+def _version_key(key: str) -> str:
+    return f"{key}:version"
+
+
+def _bump_versions(pipe, keys: List[str]):
+    """Queue a version bump per key, so loads that started before it don't cache what they read"""
+    for key in keys:
+        pipe.incr(_version_key(key))
+        pipe.expire(_version_key(key), settings.CACHE_TTL)
+
+
+async def get_versions(keys: List[str]) -> List[Optional[str]]:
+    """Invalidation versions of keys; snapshot them before loading the values to cache"""
+    try:
+        if redis_client is None or not keys:
+            return [None] * len(keys)
+        
+        with time_cache("mget"):
+            return await redis_client.mget([_version_key(key) for key in keys])
+    except Exception as e:
+        print(f"Cache version get error: {e}")
+        return [None] * len(keys)
+
+
+async def set_cache_unless_invalidated(
+    items: Dict[str, Any], versions: Dict[str, Optional[str]], ttl: int = settings.CACHE_TTL
+) -> bool:
+    """Cache freshly loaded values, skipping keys invalidated since their versions were read.
+    
+    The versions are compared under WATCH, so a delete racing the write
+    aborts it instead of leaving the pre-write value cached for the TTL.
+    Without Redis there is nothing to compare against, and the local
+    tier's TTL bounds the staleness.
+    """
+    if not items:
+        return True
+    try:
+        if redis_client is None:
+            for key, value in items.items():
+                local_cache.set(key, value, ttl)
+            return False
+        
+        version_keys = [_version_key(key) for key in items]
+        with time_cache("set", "ok"):
+            async with redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(*version_keys)
+                current = await pipe.mget(version_keys)
+                fresh = {
+                    key: value for (key, value), version in zip(items.items(), current)
+                    if version == versions.get(key)
+                }
+                if not fresh:
+                    return False
+                pipe.multi()
+                for key, value in fresh.items():
+                    pipe.setex(key, ttl, json.dumps(value, default=str))
+                await pipe.execute()
+    except WatchError:
+        # One of the keys was invalidated while writing; the next read loads it again
+        return False
+    except Exception as e:
+        print(f"Cache set error: {e}")
+        fresh = items
+    for key, value in fresh.items():
+        local_cache.set(key, value, ttl)
+    return len(fresh) == len(items)
+
+
 async def delete_cache(key: str) -> bool:
     """Delete value from cache"""
+    local_cache.delete(key)
     try:
         if redis_client is None:
             return False
         
-        await redis_client.delete(key)
+        with time_cache("delete", "ok"):
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                _bump_versions(pipe, [key])
+                await pipe.execute()
+        await _publish_invalidation({"key": key})
         return True
     except Exception as e:
         print(f"Cache delete error: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+async def get_or_load(
+    key: str,
+    loader: Callable[[], Awaitable[Optional[Any]]],
+    ttl: int = settings.CACHE_TTL,
+) -> Optional[Any]:
+    """Read-through lookup with single-flight loading.
+    
+    Concurrent callers for the same key share one cache lookup and, on a
+    miss, one call to loader, so an expired hot key costs a single query
+    per worker. None results are not cached, and neither are results of a
+    load that a delete_cache of the key overlapped.
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = await get_cache(key)
+        if value is None:
+            # Read before loading, so a write committed during the load is noticed
+            [version] = await get_versions([key])
+            value = await loader()
+            if value is not None:
+                await set_cache_unless_invalidated({key: value}, {key: version}, ttl)
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # waiters re-raise it; don't warn when there are none
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        del _inflight[key]
+
+
+async def delete_cache_many(keys: List[str]) -> bool:
+    """Delete several values with one DELETE and one invalidation message"""
+    if not keys:
+        return True
+    for key in keys:
+        local_cache.delete(key)
+    try:
+        if redis_client is None:
+            return False
+        
+        with time_cache("delete", "ok"):
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                _bump_versions(pipe, keys)
+                await pipe.execute()
+        await _publish_invalidation({"keys": keys})
+        return True
+    except Exception as e:
+        print(f"Cache delete error: {e}")
+        return False
+
+
+def _generation_key(namespace: str) -> str:
+    return f"{namespace}:generation"
+
+
+async def get_generation(namespace: str) -> int:
+    """Get the current generation of a cache namespace"""
+    generation = local_cache.get(_generation_key(namespace))
+    if generation is not None:
+        return generation
+
+    try:
+        if redis_client is None:
+            return 0
+        
+        value = await redis_client.get(_generation_key(namespace))
+        generation = int(value) if value else 0
+        local_cache.set(_generation_key(namespace), generation)
+        return generation
+    except Exception as e:
+        print(f"Cache generation get error: {e}")
+        return 0
+
+
+async def bump_generation(namespace: str) -> bool:
+    """Invalidate every key of a namespace with a single INCR.
+    
+    Keys built with the old generation are never read again and
+    expire through their TTL. Other workers drop their local copies
+    when the invalidation message arrives.
+    """
+    local_cache.delete_prefix(f"{namespace}:")
+    try:
+        if redis_client is None:
+            return False
+        
+        await redis_client.incr(_generation_key(namespace))
+        await _publish_invalidation({"namespace": namespace})
+        return True
+    except Exception as e:
+        print(f"Cache generation bump error: {e}")
+        return False
+
+
+def on_event(name: str, handler: Callable[[Any], None]):
+    """Register a handler for events broadcast with publish_event"""
+    _event_handlers[name] = handler
+
+
+async def publish_event(name: str, payload: Any) -> bool:
+    """Broadcast an event to every worker, this one included"""
+    try:
+        if redis_client is None:
+            return False
+        
+        await _publish_invalidation({"event": name, "payload": payload})
+        return True
+    except Exception as e:
+        print(f"Cache event publish error: {e}")
+        return False
+
+
+async def _publish_invalidation(message: Dict[str, Any]):
+    await redis_client.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+
+
+def _apply_invalidation(message: Dict[str, Any]):
+    """Drop local entries named by an invalidation message"""
+    if "namespace" in message:
+        local_cache.delete_prefix(f"{message['namespace']}:")
+    elif "key" in message:
+        local_cache.delete(message["key"])
+    elif "keys" in message:
+        for key in message["keys"]:
+            local_cache.delete(key)
+    elif message.get("event") in _event_handlers:
+        _event_handlers[message["event"]](message["payload"])
+
+
+async def _listen_for_invalidations():
+    """Apply invalidations published by any worker to this worker's local tier"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _apply_invalidation(json.loads(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Cache invalidation listener error: {e}")
+            # Messages may have been missed while disconnected
+            local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
@@ -0,0 +1,135 @@
+import gzip
+import zlib
+from functools import lru_cache
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from app.utils.http_cache import variant_etag
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+# Preferred first when the client weighs codings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Best content coding we support from an Accept-Encoding header, or None"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ENCODINGS:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body; gzip output has no timestamp, so equal bodies compress equally"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+def encoded_headers(headers: Dict[str, str], encoding: str) -> Dict[str, str]:
+    """Response headers for a body that is already compressed with encoding"""
+    headers = {**headers, "Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    if "ETag" in headers:
+        headers["ETag"] = variant_etag(headers["ETag"], encoding)
+    return headers
+
+
+class _StreamEncoder:
+    """Incremental compressor for streamed responses"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+            self.compress, self.flush = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            self.compress, self.flush = compressor.compress, compressor.flush
+
+
+def _compressible(headers: Headers) -> bool:
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """gzip or brotli for JSON, NDJSON and text responses, negotiated on Accept-Encoding.
+    
+    Bodies under COMPRESSION_MIN_SIZE and responses that already carry a
+    Content-Encoding, such as pre-compressed cache entries, pass through.
+    Streamed responses are compressed chunk by chunk. Each coding gets
+    its own ETag, since a strong ETag names exact bytes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        encoder: Optional[_StreamEncoder] = None
+
+        async def send_wrapper(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether it is worth compressing
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                if encoder is not None and message["type"] == "http.response.body":
+                    message = self._encode(message, encoder)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(start.get("headers", [])))
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if _compressible(headers) and "content-encoding" not in headers:
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if encoding and (more_body or len(body) >= settings.COMPRESSION_MIN_SIZE):
+                    encoder = _StreamEncoder(encoding)
+                    headers["Content-Encoding"] = encoding
+                    if "etag" in headers:
+                        headers["ETag"] = variant_etag(headers["ETag"], encoding)
+                    message = self._encode(message, encoder)
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(message["body"]))
+            await send({**start, "headers": headers.raw})
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _encode(message, encoder: _StreamEncoder):
+        body = encoder.compress(message.get("body", b""))
+        if not message.get("more_body", False):
+            body += encoder.flush()
+        return {**message, "body": body}
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,8 +9,46 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     ENVIRONMENT: str = "development"
     
+    # Read replicas, as a JSON list of URLs; empty sends every query to DATABASE_URL
+    REPLICA_DATABASE_URLS: List[str] = []
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0  # seconds between probes
+    REPLICA_HEALTH_CHECK_TIMEOUT: float = 1.0
+    REPLICA_READ_AFTER_WRITE_SECONDS: float = 1.0  # reads stay on the primary this long after a write
+    
     # Cache settings
     CACHE_TTL: int = 300  # 5 minutes
+    LOCAL_CACHE_MAX_ITEMS: int = 1024  # per worker process
+    LOCAL_CACHE_TTL: int = 30  # upper bound on staleness if an invalidation is missed
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    
+    # HTTP caching settings, sent as Cache-Control on conditional GETs
+    HTTP_CACHE_MAX_AGE: int = 0  # seconds clients and CDNs reuse a response without revalidating
+    HTTP_CACHE_STALE_WHILE_REVALIDATE: int = 60  # seconds a stale response may be served while revalidating
+    
+    # Compression settings; brotli is used when the package is installed
+    COMPRESSION_MIN_SIZE: int = 500  # bytes; smaller responses are sent uncompressed
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5  # 0-11; higher is smaller but costs far more CPU
+    
+    # Autocomplete settings
+    AUTOCOMPLETE_MAX_ENTRIES: int = 2_000_000  # per worker process
+    
+    # Leaderboard settings
+    LEADERBOARD_TIERS: List[int] = [1, 10, 100]  # min_reviews values answered without filtering
+    
+    # Background job settings
+    JOB_COALESCE_WINDOW: float = 0.5  # seconds a job waits so bursts of writes share one run
+    
+    # Metrics settings
+    METRICS_ENABLED: bool = True  # route, DB and pool instrumentation for /metrics
+    
+    # Profiling settings
+    PROFILE_TOKEN: Optional[str] = None  # X-Profile-Token value enabling profiling outside DEBUG
+    PROFILE_N_PLUS_ONE_THRESHOLD: int = 2  # identical SELECTs per request flagged as N+1
+    
+    # Query statistics settings
+    QUERY_STATS_MAX_FINGERPRINTS: int = 500  # per worker process
+    SLOW_QUERY_THRESHOLD_MS: int = 200
     
     class Config:
         env_file = ".env"
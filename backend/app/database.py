@@ -1,12 +1,163 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import time
+from collections import OrderedDict
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from typing import AsyncGenerator, List, Optional
 from app.config import settings
+from app.models.base import Base
+from app.metrics import instrument_engine
+from app.profiling import track_statements
+from app.query_stats import track_query_stats
 
+# Identifies a client across requests for read-your-writes routing
+CLIENT_ID_HEADER = "x-client-id"
+
+# Async drivers used for each sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_url(url: str) -> str:
+    """Convert a sync database URL to its async driver equivalent"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ASYNC_DRIVERS and parsed.drivername != ASYNC_DRIVERS[backend]:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+
+# Sync engine, used by Alembic and scripts
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+
+
+class ReplicaSet:
+    """Read replicas served round-robin, minus those failing health checks"""
+
+    def __init__(self, engines: List[AsyncEngine]):
+        self.engines = engines
+        self.healthy = list(engines)
+        # Last write time per client, oldest first
+        self._writes: "OrderedDict[str, float]" = OrderedDict()
+        self._next = 0
+
+    def choose(self, client: Optional[str] = None) -> Optional[AsyncEngine]:
+        """Next healthy replica, or None when reads should use the primary"""
+        if not self.healthy or self.recently_written(client):
+            return None
+        self._next = (self._next + 1) % len(self.healthy)
+        return self.healthy[self._next]
+
+    def mark_write(self, client: Optional[str] = None):
+        """Keep this client's reads on the primary for the read-after-write window"""
+        now = time.monotonic()
+        while self._writes:
+            oldest, written_at = next(iter(self._writes.items()))
+            if now - written_at < settings.REPLICA_READ_AFTER_WRITE_SECONDS:
+                break
+            del self._writes[oldest]
+        if client is not None:
+            self._writes[client] = now
+            self._writes.move_to_end(client)
+
+    def recently_written(self, client: Optional[str] = None) -> bool:
+        """Replicas may lag a fresh write; the client that made it reads it back from the primary"""
+        written_at = self._writes.get(client) if client is not None else None
+        if written_at is None:
+            return False
+        return time.monotonic() - written_at < settings.REPLICA_READ_AFTER_WRITE_SECONDS
+
+    async def check_health(self):
+        """Probe every replica and keep only the responsive ones in rotation"""
+        healthy = []
+        for engine in self.engines:
+            try:
+                # Bounds connecting too, so a hanging replica can't stall the loop
+                await asyncio.wait_for(_probe(engine), settings.REPLICA_HEALTH_CHECK_TIMEOUT)
+                healthy.append(engine)
+            except Exception as e:
+                print(f"Replica health check error ({engine.url.render_as_string()}): {e}")
+        self.healthy = healthy
+
+    async def run_health_checks(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+
+    async def dispose(self):
+        for engine in self.engines:
+            await engine.dispose()
+
+
+async def _probe(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+class RoutingSession(Session):
+    """Session sending replica-eligible reads to replicas and everything else to the primary.
+
+    Reads opt in with ``.execution_options(use_replica=True)``. Once a
+    session writes, all its later reads stay on the primary so it sees
+    its own writes. Sessions tagged with ``info["client"]`` also send
+    that client's reads to the primary for a while after its writes.
+    """
+
+    def __init__(self, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            if self.replicas is not None:
+                self.replicas.mark_write(self.info.get("client"))
+        elif (
+            self.replicas is not None
+            and clause is not None
+            and not self.info.get("wrote")
+            and clause.get_execution_options().get("use_replica")
+        ):
+            replica = self.replicas.choose(self.info.get("client"))
+            if replica is not None:
+                return replica.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def make_sessionmaker(primary: AsyncEngine, replicas: Optional[ReplicaSet] = None) -> async_sessionmaker:
+    """Async sessions on the primary that route opted-in reads to replicas"""
+    return async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replicas=replicas,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+# Async engines, used by the API
+async_engine = create_async_engine(get_async_url(settings.DATABASE_URL))
+replicas = ReplicaSet([
+    create_async_engine(get_async_url(url)) for url in settings.REPLICA_DATABASE_URLS
+])
+AsyncSessionLocal = make_sessionmaker(async_engine, replicas)
+
+for name, instrumented in [("primary", async_engine)] + [
+    (f"replica{number}", engine) for number, engine in enumerate(replicas.engines, start=1)
+]:
+    if settings.METRICS_ENABLED:
+        instrument_engine(instrumented.sync_engine, name)
+    track_statements(instrumented.sync_engine)
+    track_query_stats(instrumented.sync_engine)
 
 
 def create_tables():
@@ -14,10 +165,35 @@ def create_tables():
     Base.metadata.create_all(bind=engine)
 
 
+async def create_tables_async():
+    """Create database tables without blocking the event loop"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
 def get_db():
     """Database dependency"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def client_key(request: Request) -> Optional[str]:
+    """Who a request is from, for read-your-writes: X-Client-Id, else the peer address.
+
+    The address fallback is shared by every client behind one proxy or NAT,
+    which only sends more of their reads to the primary.
+    """
+    client_id = request.headers.get(CLIENT_ID_HEADER)
+    if client_id:
+        return client_id
+    return request.client.host if request.client else None
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Async database dependency"""
+    async with AsyncSessionLocal() as db:
+        db.info["client"] = client_key(request)
+        yield db
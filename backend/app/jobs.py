@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from app.config import settings
+from app.metrics import JOB_DURATION, JOB_QUEUE_DEPTH, JOB_QUEUE_LAG, JOB_RUNS
+from app.profiling import detached_context
+
+
+class CoalescingJob:
+    """A background job whose pending keys merge until it runs"""
+
+    def __init__(self, name: str, handler: Callable[[Set[Any]], Awaitable[None]], window: float):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.pending: Set[Hashable] = set()
+        self.first_submitted = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.wake: Optional[asyncio.Event] = None
+
+
+class JobQueue:
+    """In-process queue that takes post-write work off the request path.
+    
+    Submitting keys schedules one run of the job after its coalescing
+    window; everything submitted meanwhile joins that run, so a burst of
+    writes costs a single run. Runs of one job never overlap.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._jobs: Dict[str, CoalescingJob] = {}
+
+    def register(self, name: str, handler: Callable[[Set[Any]], Awaitable[None]], window: Optional[float] = None):
+        self._jobs[name] = CoalescingJob(name, handler, self.window if window is None else window)
+
+    def submit(self, name: str, *keys: Hashable):
+        """Queue keys for the named job; must be called from the event loop"""
+        job = self._jobs[name]
+        if not job.pending:
+            job.first_submitted = time.monotonic()
+        job.pending.update(keys)
+        JOB_QUEUE_DEPTH.labels(name).set(len(job.pending))
+        if not self._scheduled(job):
+            # Created per run: events bind to the loop that first awaits them
+            job.wake = asyncio.Event()
+            job.task = asyncio.create_task(self._run(job), context=detached_context())
+
+    @staticmethod
+    def _scheduled(job: CoalescingJob) -> bool:
+        """Whether a run is pending on this loop; a closed loop drops its tasks"""
+        return (
+            job.task is not None
+            and not job.task.done()
+            and job.task.get_loop() is asyncio.get_running_loop()
+        )
+
+    def depth(self, name: str) -> int:
+        return len(self._jobs[name].pending)
+
+    async def _run(self, job: CoalescingJob):
+        try:
+            while job.pending:
+                try:
+                    await asyncio.wait_for(job.wake.wait(), job.window)
+                except asyncio.TimeoutError:
+                    pass
+                
+                keys, job.pending = job.pending, set()
+                JOB_QUEUE_DEPTH.labels(job.name).set(0)
+                JOB_QUEUE_LAG.labels(job.name).observe(time.monotonic() - job.first_submitted)
+                start = time.perf_counter()
+                try:
+                    await job.handler(keys)
+                    JOB_RUNS.labels(job.name, "ok").inc()
+                except Exception as e:
+                    JOB_RUNS.labels(job.name, "error").inc()
+                    print(f"Background job {job.name} error: {e}")
+                finally:
+                    JOB_DURATION.labels(job.name).observe(time.perf_counter() - start)
+        finally:
+            job.task = None
+
+    async def flush(self):
+        """Run every pending job now and wait for it, e.g. on shutdown"""
+        while any(self._scheduled(job) for job in self._jobs.values()):
+            tasks = []
+            for job in self._jobs.values():
+                if self._scheduled(job):
+                    job.wake.set()
+                    tasks.append(job.task)
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_queue = JobQueue(settings.JOB_COALESCE_WINDOW)
@@ -0,0 +1,347 @@
+import asyncio
+import bisect
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import cache
+from app.cache import on_event, publish_event
+from app.config import settings
+from app.metrics import time_cache
+
+# (book id, rating sum, review count), as stored on books
+Rating = Tuple[int, float, int]
+
+LEADERBOARD_KEY = "leaderboard:min_reviews:{tier}"
+REVIEW_COUNTS_KEY = "leaderboard:review_counts"
+LEADERBOARD_EVENT = "leaderboard"
+REBUILD_BATCH_SIZE = 10000
+SCAN_PAGE_SIZE = 100
+
+TIERS = sorted(settings.LEADERBOARD_TIERS)
+
+
+def score(rating_sum: float, review_count: int) -> float:
+    """Unrounded mean rating, so books with the same displayed average still rank apart"""
+    return rating_sum / review_count if review_count else 0.0
+
+
+def tier_for(min_reviews: int) -> int:
+    """Largest tier not above min_reviews; its members only need a review count filter"""
+    candidates = [tier for tier in TIERS if tier <= min_reviews]
+    return candidates[-1] if candidates else TIERS[0]
+
+
+class LocalLeaderboard:
+    """Books ranked by mean rating per review count tier, local to one worker process.
+
+    The fallback when Redis is unreachable, built only once a Redis read
+    fails and dropped when one succeeds again, so healthy workers neither
+    hold every rated book nor pay for updates. Each tier is a sorted array
+    of (-score, book id), so top-k reads are O(log n + k) like the sorted
+    sets. Updates take absolute values, so a worker can apply its own
+    broadcast again without harm.
+    """
+
+    def __init__(self):
+        self._ranked: Dict[int, List[Tuple[float, int]]] = {tier: [] for tier in TIERS}
+        self._ratings: Dict[int, Tuple[float, int]] = {}
+        # Updates received while a build loads its rows, replayed over them
+        self._pending: Optional[Dict[int, Tuple[float, int]]] = None
+        self.built = False
+
+    def begin_build(self):
+        """Start keeping updates aside until build() receives its rows"""
+        self._pending = {}
+
+    def build(self, ratings: Iterable[Rating]):
+        """Replace the board with the given (id, rating sum, review count) rows"""
+        self._ratings = {
+            book_id: (score(rating_sum, review_count), review_count)
+            for book_id, rating_sum, review_count in ratings if review_count
+        }
+        for tier in TIERS:
+            self._ranked[tier] = sorted(
+                (-value, book_id) for book_id, (value, count) in self._ratings.items() if count >= tier
+            )
+        pending, self._pending = self._pending or {}, None
+        self.built = True
+        for book_id, (rating_sum, review_count) in pending.items():
+            self.update(book_id, rating_sum, review_count)
+
+    def clear(self):
+        """Drop the board; updates are ignored until the next build"""
+        self._ranked = {tier: [] for tier in TIERS}
+        self._ratings = {}
+        self._pending = None
+        self.built = False
+
+    def update(self, book_id: int, rating_sum: float, review_count: int):
+        """Move one book to its new score, keeping every tier sorted"""
+        if self._pending is not None:
+            self._pending[book_id] = (rating_sum, review_count)
+            return
+        if not self.built:
+            return
+        old = self._ratings.pop(book_id, None)
+        if old is not None:
+            for tier in TIERS:
+                if old[1] >= tier:
+                    self._remove(tier, (-old[0], book_id))
+        if not review_count:
+            return
+        value = score(rating_sum, review_count)
+        self._ratings[book_id] = (value, review_count)
+        for tier in TIERS:
+            if review_count >= tier:
+                bisect.insort(self._ranked[tier], (-value, book_id))
+
+    def _remove(self, tier: int, entry: Tuple[float, int]):
+        ranked = self._ranked[tier]
+        position = bisect.bisect_left(ranked, entry)
+        if position < len(ranked) and ranked[position] == entry:
+            del ranked[position]
+
+    def top(self, min_reviews: int, limit: int) -> List[Tuple[int, float]]:
+        """(book id, score) of the best-rated books with at least min_reviews reviews"""
+        ranked = []
+        for negative_score, book_id in self._ranked[tier_for(min_reviews)]:
+            if len(ranked) >= limit:
+                break
+            if self._ratings[book_id][1] >= min_reviews:
+                ranked.append((book_id, -negative_score))
+        return ranked
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+
+local_leaderboard = LocalLeaderboard()
+_local_build: Optional[asyncio.Future] = None
+
+
+async def top_rated(min_reviews: int = 1, limit: int = 10) -> List[Tuple[int, float]]:
+    """(book id, score) of the best-rated books with at least min_reviews reviews.
+
+    Served from the Redis sorted set of the largest tier not above
+    min_reviews, or from this worker's copy when Redis is unavailable.
+    """
+    try:
+        if cache.redis_client is not None:
+            with time_cache("leaderboard_read", "ok"):
+                ranked = await _top_rated_from_redis(min_reviews, limit)
+            if local_leaderboard.built:
+                local_leaderboard.clear()
+            return ranked
+    except Exception as e:
+        print(f"Leaderboard read error: {e}")
+    await _build_local_leaderboard()
+    return local_leaderboard.top(min_reviews, limit)
+
+
+async def _build_local_leaderboard():
+    """Load this worker's board from the database, once for all concurrent readers"""
+    global _local_build
+    if local_leaderboard.built:
+        return
+    if _local_build is not None:
+        return await asyncio.shield(_local_build)
+
+    from app.database import AsyncSessionLocal
+
+    future = _local_build = asyncio.get_running_loop().create_future()
+    local_leaderboard.begin_build()
+    try:
+        async with AsyncSessionLocal() as db:
+            local_leaderboard.build(await load_ratings(db))
+        future.set_result(None)
+    except Exception as e:
+        local_leaderboard.clear()
+        future.set_exception(e)
+        future.exception()  # waiters re-raise it; don't warn when there are none
+        raise
+    except BaseException:
+        local_leaderboard.clear()
+        future.cancel()
+        raise
+    finally:
+        _local_build = None
+
+
+async def _top_rated_from_redis(min_reviews: int, limit: int) -> List[Tuple[int, float]]:
+    tier = tier_for(min_reviews)
+    key = LEADERBOARD_KEY.format(tier=tier)
+    if tier >= min_reviews:
+        entries = await cache.redis_client.zrevrange(key, 0, limit - 1, withscores=True)
+        return [(int(member), value) for member, value in entries]
+
+    # Between tiers: walk the lower tier and skip books with too few reviews
+    ranked = []
+    start = 0
+    while len(ranked) < limit:
+        entries = await cache.redis_client.zrevrange(key, start, start + SCAN_PAGE_SIZE - 1, withscores=True)
+        if not entries:
+            break
+        counts = await cache.redis_client.hmget(REVIEW_COUNTS_KEY, [member for member, _ in entries])
+        ranked.extend(
+            (int(member), value)
+            for (member, value), count in zip(entries, counts)
+            if count is not None and int(count) >= min_reviews
+        )
+        start += SCAN_PAGE_SIZE
+    return ranked[:limit]
+
+
+async def record_rating(book_id: int, rating: float, rating_sum: float, review_count: int):
+    """Fold one new rating into the leaderboard; call after its transaction commits.
+
+    Scores move by the change in the book's mean with ZINCRBY and counts
+    with HINCRBY. Increments commute, so concurrent reviews of one book
+    add up to the right score in whatever order they reach Redis. A book
+    entering a tier is incremented from zero.
+    """
+    old_count = review_count - 1
+    old_score = score(rating_sum - rating, old_count)
+    new_score = score(rating_sum, review_count)
+    _apply_leaderboard_event([[book_id, rating_sum, review_count]])
+    await publish_event(LEADERBOARD_EVENT, [[book_id, rating_sum, review_count]])
+    try:
+        if cache.redis_client is None:
+            return
+        
+        with time_cache("leaderboard_update", "ok"):
+            async with cache.redis_client.pipeline(transaction=False) as pipe:
+                for tier in TIERS:
+                    if review_count >= tier:
+                        delta = new_score - old_score if old_count >= tier else new_score
+                        pipe.zincrby(LEADERBOARD_KEY.format(tier=tier), delta, book_id)
+                pipe.hincrby(REVIEW_COUNTS_KEY, book_id, 1)
+                await pipe.execute()
+    except Exception as e:
+        print(f"Leaderboard update error: {e}")
+
+
+async def set_ratings(ratings: List[Rating]):
+    """Overwrite the entries of many books, e.g. after a bulk recompute"""
+    if not ratings:
+        return
+    payload = [list(rating) for rating in ratings]
+    _apply_leaderboard_event(payload)
+    await publish_event(LEADERBOARD_EVENT, payload)
+    try:
+        if cache.redis_client is None:
+            return
+        
+        with time_cache("leaderboard_update", "ok"):
+            async with cache.redis_client.pipeline(transaction=False) as pipe:
+                for book_id, rating_sum, review_count in ratings:
+                    for tier in TIERS:
+                        key = LEADERBOARD_KEY.format(tier=tier)
+                        if review_count >= tier:
+                            pipe.zadd(key, {book_id: score(rating_sum, review_count)})
+                        else:
+                            pipe.zrem(key, book_id)
+                    pipe.hset(REVIEW_COUNTS_KEY, book_id, review_count)
+                await pipe.execute()
+    except Exception as e:
+        print(f"Leaderboard update error: {e}")
+
+
+async def load_ratings(db: AsyncSession) -> List[Rating]:
+    """(id, rating sum, review count) of every rated book, streamed in batches"""
+    from app.models.book import Book
+
+    result = await db.stream(
+        select(Book.id, Book.rating_sum, Book.review_count)
+        .where(Book.review_count > 0)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    return [tuple(row) async for row in result]
+
+
+async def rebuild_leaderboard(force: bool = True) -> Optional[int]:
+    """Recompute the Redis leaderboard from the books table; returns the number of rated books.
+
+    Redis keys are written under scratch names and renamed over the live
+    ones at the end, so readers never see a partial board. Ratings
+    committed while it runs may be missed; run it again to pick them up.
+    With force=False, as at startup, the books are only read when Redis
+    has no board. Returns None when Redis is unavailable or, with
+    force=False, already has a board.
+    """
+    from app.database import AsyncSessionLocal
+
+    if cache.redis_client is None:
+        return None
+    try:
+        if not force and await cache.redis_client.exists(REVIEW_COUNTS_KEY):
+            return None
+    except Exception as e:
+        print(f"Leaderboard rebuild error: {e}")
+        return None
+
+    async with AsyncSessionLocal() as db:
+        ratings = await load_ratings(db)
+    try:
+        await _replace_redis_leaderboard(ratings)
+    except Exception as e:
+        print(f"Leaderboard rebuild error: {e}")
+    return len(ratings)
+
+
+async def _replace_redis_leaderboard(ratings: List[Rating]):
+    # A scratch suffix per run, so workers rebuilding at once can't mix their writes
+    suffix = f":rebuild:{uuid.uuid4().hex}"
+    live_keys = [LEADERBOARD_KEY.format(tier=tier) for tier in TIERS] + [REVIEW_COUNTS_KEY]
+    filled = set()
+    async with cache.redis_client.pipeline(transaction=False) as pipe:
+        for start in range(0, len(ratings), REBUILD_BATCH_SIZE):
+            chunk = ratings[start:start + REBUILD_BATCH_SIZE]
+            for tier in TIERS:
+                members = {
+                    book_id: score(rating_sum, review_count)
+                    for book_id, rating_sum, review_count in chunk if review_count >= tier
+                }
+                if members:
+                    key = LEADERBOARD_KEY.format(tier=tier)
+                    pipe.zadd(key + suffix, members)
+                    filled.add(key)
+            pipe.hset(
+                REVIEW_COUNTS_KEY + suffix,
+                mapping={book_id: review_count for book_id, _, review_count in chunk},
+            )
+            filled.add(REVIEW_COUNTS_KEY)
+            await pipe.execute()
+
+    async with cache.redis_client.pipeline(transaction=True) as pipe:
+        for key in live_keys:
+            if key in filled:
+                pipe.rename(key + suffix, key)
+            else:
+                pipe.delete(key)
+        await pipe.execute()
+
+
+def _apply_leaderboard_event(ratings: List[List]):
+    for book_id, rating_sum, review_count in ratings:
+        local_leaderboard.update(book_id, rating_sum, review_count)
+
+
+on_event(LEADERBOARD_EVENT, _apply_leaderboard_event)
+
+
+async def _main():
+    await cache.init_cache()
+    try:
+        count = await rebuild_leaderboard()
+        if count is None:
+            print("Redis is unavailable; leaderboard not rebuilt")
+        else:
+            print(f"Rebuilt leaderboard with {count} rated books")
+    finally:
+        await cache.close_cache()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
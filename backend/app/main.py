@@ -1,23 +1,45 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+import asyncio
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import uvicorn
 
 from app.config import settings
-from app.database import engine, create_tables
-from app.cache import init_cache
-from app.routers import books, reviews
+from app.database import async_engine, create_tables_async, replicas
+from app.cache import init_cache, close_cache, get_cache_stats
+from app.autocomplete import build_autocomplete_index
+from app.leaderboard import rebuild_leaderboard
+from app.jobs import job_queue
+from app.routers import books, reviews, debug
 from app.exceptions import CustomHTTPException
+from app.metrics import MetricsMiddleware
+from app.compression import CompressionMiddleware
+from app.profiling import ProfilingMiddleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    create_tables()
+    await create_tables_async()
     await init_cache()
+    await build_autocomplete_index()
+    await rebuild_leaderboard(force=False)
+    health_checks = None
+    if replicas.engines:
+        await replicas.check_health()
+        health_checks = asyncio.create_task(replicas.run_health_checks())
     yield
     # Shutdown
-    pass
+    if health_checks is not None:
+        health_checks.cancel()
+        with suppress(asyncio.CancelledError):
+            await health_checks
+    await job_queue.flush()
+    await close_cache()
+    await replicas.dispose()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -36,14 +58,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request SQL accounting and ?profile=1 reports, in DEBUG or with X-Profile-Token
+app.add_middleware(ProfilingMiddleware)
+
+# Compresses everything the inner layers send, profiling reports included
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so latency covers every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(books.router, prefix="/books", tags=["books"])
 app.include_router(reviews.router, prefix="/books", tags=["reviews"])
+app.include_router(reviews.bulk_router, prefix="/reviews", tags=["reviews"])
+app.include_router(debug.router, prefix="/debug", tags=["debug"])
 
 
 @app.exception_handler(CustomHTTPException)
 async def custom_http_exception_handler(request, exc: CustomHTTPException):
-    return HTTPException(status_code=exc.status_code, detail=exc.detail)
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 
 @app.get("/")
@@ -56,6 +90,18 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit ratios of this worker's local and Redis cache tiers"""
+    return get_cache_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
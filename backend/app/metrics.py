@@ -0,0 +1,176 @@
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Metrics are per worker process; Prometheus scrapes and sums every worker
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["method"],
+)
+
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed",
+    ["operation"],
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["engine"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size",
+    ["engine"],
+)
+
+CACHE_OPERATIONS = Counter(
+    "cache_operations_total",
+    "Redis cache operations by result (hit, miss, ok, error)",
+    ["operation", "result"],
+)
+CACHE_OPERATION_DURATION = Histogram(
+    "cache_operation_duration_seconds",
+    "Redis cache operation latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth",
+    "Coalesced keys waiting for a background job run",
+    ["job"],
+)
+JOB_QUEUE_LAG = Histogram(
+    "job_queue_lag_seconds",
+    "Time from the first submit of a batch to the start of its run",
+    ["job"],
+    buckets=LATENCY_BUCKETS,
+)
+JOB_RUNS = Counter(
+    "job_runs_total",
+    "Background job runs by result (ok, error)",
+    ["job", "result"],
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Background job run time",
+    ["job"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def route_template(scope) -> str:
+    """Path template of the route that served a request, to keep labels low-cardinality.
+    
+    FastAPI records the matched route in the scope while routing, which is
+    much cheaper than matching every route again.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, route_template(scope), str(status)).observe(elapsed)
+
+
+# Labelled children resolved once; labels() takes a lock on every call
+_QUERY_METRICS = {
+    operation: (DB_QUERIES.labels(operation), DB_QUERY_DURATION.labels(operation))
+    for operation in SQL_OPERATIONS | {"OTHER"}
+}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    count, duration = _QUERY_METRICS.get(statement.lstrip()[:6].upper()) or _QUERY_METRICS["OTHER"]
+    count.inc()
+    duration.observe(elapsed)
+
+
+def instrument_engine(engine: Engine, name: str = "primary"):
+    """Record query counts, durations and pool usage for a sync engine.
+
+    Pass ``async_engine.sync_engine`` for async engines.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    event.listen(engine, "checkout", lambda *args: checked_out.inc())
+    event.listen(engine, "checkin", lambda *args: checked_out.dec())
+    # Read the pool at scrape time; dispose() swaps in a new one
+    DB_POOL_OVERFLOW.labels(name).set_function(lambda: _pool_overflow(engine))
+
+
+def _pool_overflow(engine: Engine) -> int:
+    overflow = getattr(engine.pool, "overflow", None)
+    return max(0, overflow()) if overflow else 0
+
+
+@contextmanager
+def time_cache(operation: str, result: Optional[str] = None):
+    """Time one Redis call and count it; failures are counted as errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        CACHE_OPERATIONS.labels(operation, "error").inc()
+        raise
+    else:
+        if result:
+            CACHE_OPERATIONS.labels(operation, result).inc()
+    finally:
+        CACHE_OPERATION_DURATION.labels(operation).observe(time.perf_counter() - start)
@@ -1,5 +1,6 @@
 from app.models.base import Base
 from app.models.book import Book
 from app.models.review import Review
+from app.models import search  # registers full-text search DDL
 
 __all__ = ["Base", "Book", "Review"]
\ No newline at end of file
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Float
+from sqlalchemy import Column, Integer, String, Text, Float, Index, case
 from sqlalchemy.orm import relationship
 from app.models.base import Base, TimestampMixin
 
+STAR_BUCKETS = range(1, 6)
+
 
 class Book(Base, TimestampMixin):
     __tablename__ = "books"
+    __table_args__ = (
+        # Incremental exports filter and order on (updated_at, id)
+        Index("ix_books_updated_at_id", "updated_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
@@ -13,9 +19,33 @@ class Book(Base, TimestampMixin):
     isbn = Column(String(13), unique=True, index=True)
     published_year = Column(Integer)
     average_rating = Column(Float, default=0.0)
+    # Running aggregates so average_rating never needs a scan of reviews
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    # Reviews per whole star for the rating histogram; see star_bucket
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
     
     # Relationship
     reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
+
+
+def star_column(stars: int) -> Column:
+    """Histogram column counting reviews in a star bucket"""
+    return getattr(Book, f"stars_{stars}")
+
+
+def star_bucket(rating: float) -> int:
+    """Histogram bucket of a rating in whole stars; half stars round down"""
+    return min(max(int(rating), STAR_BUCKETS[0]), STAR_BUCKETS[-1])
+
+
+def star_bucket_clause(rating):
+    """SQL form of star_bucket"""
+    return case(*((rating >= stars, stars) for stars in reversed(STAR_BUCKETS[1:])), else_=STAR_BUCKETS[0])
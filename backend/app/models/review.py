@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base, TimestampMixin
 
 
 class Review(Base, TimestampMixin):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Keyset pagination seeks on (book_id, created_at, id)
+        Index("ix_reviews_book_id_created_at_id", "book_id", "created_at", "id"),
+        # Per-book exports read in id order
+        Index("ix_reviews_book_id_id", "book_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
@@ -0,0 +1,191 @@
+import hmac
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import Context, ContextVar, copy_context
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """SQL statements executed while serving one request"""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, elapsed: float):
+        self.statements.append((statement, elapsed))
+
+    @property
+    def total_time(self) -> float:
+        return sum(elapsed for _, elapsed in self.statements)
+
+    def repeated(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """SELECTs issued at least threshold times: N+1 loops or duplicate lookups"""
+        threshold = threshold or settings.PROFILE_N_PLUS_ONE_THRESHOLD
+        counts = Counter(
+            statement for statement, _ in self.statements
+            if statement.lstrip()[:6].upper() == "SELECT"
+        )
+        return {statement: count for statement, count in counts.items() if count >= threshold}
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": len(self.statements),
+            "total_ms": round(self.total_time * 1000, 3),
+            "statements": [
+                {"sql": statement, "ms": round(elapsed * 1000, 3)} for statement, elapsed in self.statements
+            ],
+            "n_plus_one": [
+                {"sql": statement, "count": count} for statement, count in self.repeated().items()
+            ],
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - context._profile_start)
+
+
+def detached_context() -> Context:
+    """Copy of the current context without the request's profile.
+    
+    For tasks that outlive the request, so they neither add statements to
+    its finished profile nor keep it alive.
+    """
+    context = copy_context()
+    context.run(_current_profile.set, None)
+    return context
+
+
+def track_statements(engine: Engine):
+    """Record statements of profiled requests; a no-op for everything else.
+
+    Pass ``async_engine.sync_engine`` for async engines.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def debug_access_allowed(scope) -> bool:
+    """Profiling and debug endpoints are open in DEBUG or with X-Profile-Token"""
+    if settings.DEBUG:
+        return True
+    if not settings.PROFILE_TOKEN:
+        return False
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            return hmac.compare_digest(value, settings.PROFILE_TOKEN.encode())
+    return False
+
+
+class ProfilingMiddleware:
+    """Per-request SQL accounting and on-demand sampling profiles.
+
+    Active in DEBUG, or when the X-Profile-Token header matches
+    PROFILE_TOKEN. Responses gain X-SQL-Count, X-SQL-Time-Ms,
+    Server-Timing and, for repeated SELECTs, X-SQL-N-Plus-One headers.
+    With ?profile=1 the response is replaced by a JSON report holding the
+    statements and a call tree from pyinstrument.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not debug_access_allowed(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            if parse_qs(scope.get("query_string", b"").decode()).get("profile") == ["1"]:
+                await self._profile(scope, receive, send, profile)
+            else:
+                await self._account(scope, receive, send, profile)
+        finally:
+            _current_profile.reset(token)
+            self._log(scope, profile)
+
+    async def _account(self, scope, receive, send, profile: RequestProfile):
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Streaming responses may run more statements after this point
+                total_ms = (time.perf_counter() - start) * 1000
+                db_ms = profile.total_time * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-count", str(len(profile.statements)).encode()))
+                headers.append((b"x-sql-time-ms", f"{db_ms:.3f}".encode()))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={db_ms:.3f};desc="{len(profile.statements)} queries", app;dur={total_ms:.3f}'.encode(),
+                ))
+                repeated = profile.repeated()
+                if repeated:
+                    headers.append((b"x-sql-n-plus-one", str(len(repeated)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _profile(self, scope, receive, send, profile: RequestProfile):
+        from pyinstrument import Profiler
+
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        body = json.dumps({
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(profiler.last_session.duration * 1000, 3),
+            "sql": profile.as_dict(),
+            "call_tree": profiler.output_text(unicode=True, color=False, show_all=False),
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _log(self, scope, profile: RequestProfile):
+        logger.info(
+            "%s %s: %d queries in %.3f ms",
+            scope["method"], scope["path"], len(profile.statements), profile.total_time * 1000,
+        )
+        for statement, elapsed in profile.statements:
+            logger.debug("%.3f ms  %s", elapsed * 1000, " ".join(statement.split()))
+        for statement, count in profile.repeated().items():
+            logger.warning("possible N+1: %d x %s", count, " ".join(statement.split()))
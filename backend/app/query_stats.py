@@ -0,0 +1,127 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES = re.compile(r"VALUES\s*\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so every call of one query shape shares a key.
+
+    Literals and bind parameters become ?, and IN lists or multi-row
+    VALUES of any length collapse to one entry.
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _LIST.sub("(?...)", normalized)
+    return _VALUES.sub("VALUES (?...)", normalized)
+
+
+class QueryStat:
+    """Aggregated timings for one statement fingerprint"""
+    __slots__ = ("calls", "total_time", "max_time", "rows")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_time * 1000, 3),
+            "mean_ms": round(self.total_time / self.calls * 1000, 3),
+            "max_ms": round(self.max_time * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class QueryStats:
+    """Per-fingerprint query statistics, bounded to the most recently seen fingerprints"""
+
+    SORT_KEYS = {
+        "total": lambda stat: stat.total_time,
+        "mean": lambda stat: stat.total_time / stat.calls,
+        "max": lambda stat: stat.max_time,
+        "calls": lambda stat: stat.calls,
+        "rows": lambda stat: stat.rows,
+    }
+
+    def __init__(self, max_fingerprints: int):
+        self.max_fingerprints = max_fingerprints
+        self._stats: "OrderedDict[str, QueryStat]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float, rows: int = -1):
+        key = fingerprint(statement)
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None:
+                stat = self._stats[key] = QueryStat()
+                if len(self._stats) > self.max_fingerprints:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(key)
+            stat.calls += 1
+            stat.total_time += elapsed
+            stat.max_time = max(stat.max_time, elapsed)
+            # Drivers report -1 when they don't know, e.g. SQLite SELECTs
+            if rows > 0:
+                stat.rows += rows
+
+    def snapshot(self, sort: str = "total", limit: int = 50) -> List[Dict[str, Any]]:
+        """Top fingerprints by the given sort key"""
+        with self._lock:
+            items = list(self._stats.items())
+        items.sort(key=lambda item: self.SORT_KEYS[sort](item[1]), reverse=True)
+        return [{"fingerprint": key, **stat.as_dict()} for key, stat in items[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+
+query_stats = QueryStats(settings.QUERY_STATS_MAX_FINGERPRINTS)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._stats_start
+    query_stats.record(statement, elapsed, cursor.rowcount)
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        logger.warning("slow query %.1f ms: %s", elapsed * 1000, " ".join(statement.split()))
+
+
+def track_query_stats(engine: Engine):
+    """Aggregate fingerprint statistics and log slow queries for a sync engine.
+
+    Pass ``async_engine.sync_engine`` for async engines.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
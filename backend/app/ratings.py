@@ -0,0 +1,38 @@
+"""Recompute every book's rating aggregates and star histogram from its reviews.
+
+    python -m app.ratings
+
+The aggregates are kept up to date on every write; this repairs them
+after manual edits to the reviews table or a partial import. The
+leaderboard is rebuilt afterwards, since its scores come from them.
+"""
+import asyncio
+
+from app import cache
+from app.leaderboard import rebuild_leaderboard
+
+
+async def rebuild_ratings() -> int:
+    """Rebuild the aggregates, then the leaderboard; returns the number of books"""
+    from app.database import AsyncSessionLocal
+    from app.services.book_service import BookService
+
+    async with AsyncSessionLocal() as db:
+        book_service = BookService(db)
+        count = await book_service.rebuild_rating_aggregates()
+        await book_service._invalidate_books_cache()
+    await rebuild_leaderboard()
+    return count
+
+
+async def _main():
+    await cache.init_cache()
+    try:
+        count = await rebuild_ratings()
+        print(f"Rebuilt rating aggregates of {count} books")
+    finally:
+        await cache.close_cache()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
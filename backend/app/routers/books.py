@@ -1,26 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
 
-from app.database import get_db
-from app.schemas.book import BookCreate, BookResponse, BookList
+from app.database import get_async_db
+from app.schemas.book import (
+    BookCreate, BookResponse, BookList, BookBatch, BookBatchRequest, BookStats, AutocompleteSuggestion
+)
+from app.schemas.bulk import BulkResult
 from app.services.book_service import BookService
+from app.autocomplete import suggest
 from app.exceptions import BookNotFoundError
+from app.utils.helpers import dump_json, parse_fields, sparse_exclude
+from app.utils.streaming import iter_records, export_response
+from app.utils.http_cache import Validators, make_etag
+from app.compression import encoded_headers, negotiate
 
 router = APIRouter()
 
 
 @router.get("/", response_model=BookList)
 async def get_books(
+    request: Request,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; enables keyset pagination"),
+    include_total: bool = Query(False, description="Also count all books in cursor mode"),
+    fields: Optional[str] = Query(None, description="Comma-separated book fields to return, e.g. id,title,author"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all books with caching"""
+    """Get all books with caching and conditional requests"""
     try:
+        book_fields = parse_fields(fields, BookResponse)
         book_service = BookService(db)
-        result = await book_service.get_books_cached(page=page, per_page=per_page)
-        return result
+        generation, last_modified = await book_service.get_books_validator()
+        validators = Validators(
+            make_etag("books", generation, last_modified, page, per_page, cursor, include_total, book_fields),
+            last_modified,
+        )
+        if validators.matches(request):
+            return validators.not_modified()
+        
+        headers = validators.headers()
+        if cursor is not None:
+            result = dump_json(
+                await book_service.get_books_by_cursor(
+                    cursor=cursor, per_page=per_page, include_total=include_total, fields=book_fields
+                ),
+                exclude=sparse_exclude("books", BookResponse, book_fields),
+            )
+        else:
+            result, encoding = await book_service.get_books_cached(
+                generation, page=page, per_page=per_page,
+                encoding=negotiate(request.headers.get("accept-encoding", "")), fields=book_fields,
+            )
+            if encoding:
+                # Pre-compressed from cache; CompressionMiddleware passes it through
+                headers = encoded_headers(headers, encoding)
+        # Already serialized from trusted data, so skip response_model validation
+        return Response(content=result, media_type="application/json", headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -28,7 +68,7 @@ async def get_books(
 @router.post("/", response_model=BookResponse, status_code=201)
 async def create_book(
     book: BookCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new book"""
     try:
@@ -41,19 +81,142 @@ async def create_book(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def import_books(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk import books from a streamed NDJSON or CSV (text/csv) body"""
+    try:
+        book_service = BookService(db)
+        records = iter_records(request.stream(), request.headers.get("content-type", ""))
+        return await book_service.import_books(records)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search", response_model=BookList)
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over titles, authors and descriptions"""
+    try:
+        book_service = BookService(db)
+        result = await book_service.search_books(q=q, page=page, per_page=per_page)
+        return Response(content=dump_json(result), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/autocomplete", response_model=List[AutocompleteSuggestion])
+async def autocomplete_books(
+    prefix: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Type-ahead suggestions for titles and authors, served from memory without a database session"""
+    return suggest(prefix=prefix, limit=limit)
+
+
+@router.get("/top", response_model=List[BookResponse])
+async def get_top_books(
+    limit: int = Query(10, ge=1, le=100),
+    min_reviews: int = Query(1, ge=1, description="Only books with at least this many reviews"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Best-rated books, highest mean rating first"""
+    try:
+        book_service = BookService(db)
+        return await book_service.get_top_books(min_reviews=min_reviews, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch", response_model=BookBatch)
+async def get_books_batch(
+    ids: str = Query(..., description="Comma-separated book ids, at most 100"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get many books by ID in one request, in the order requested"""
+    try:
+        book_ids = [int(book_id) for book_id in ids.split(",") if book_id.strip()]
+        if not book_ids:
+            raise ValueError("No book ids given")
+        book_service = BookService(db)
+        return await book_service.get_books_by_ids(book_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/batch", response_model=BookBatch)
+async def post_books_batch(
+    batch: BookBatchRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get many books by ID, with the ids in a JSON body"""
+    try:
+        book_service = BookService(db)
+        return await book_service.get_books_by_ids(batch.ids)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_books(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    updated_since: Optional[datetime] = Query(None, description="Only books updated at or after this time"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream the whole catalog as NDJSON or CSV"""
+    book_service = BookService(db)
+    partitions = book_service.export_books(updated_since=updated_since)
+    return export_response(partitions, export_format, BookResponse, filename="books")
+
+
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(
     book_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific book by ID"""
     try:
         book_service = BookService(db)
-        book = book_service.get_book_by_id(book_id)
+        book = await book_service.get_book_cached(book_id)
         if not book:
             raise BookNotFoundError(book_id)
+        
+        validators = Validators(make_etag("book", book_id, book.updated_at), book.updated_at)
+        if validators.matches(request):
+            return validators.not_modified()
+        response.headers.update(validators.headers())
         return book
     except BookNotFoundError:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{book_id}/stats", response_model=BookStats)
+async def get_book_stats(
+    book_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Star histogram, mean rating and review count of a book"""
+    try:
+        book_service = BookService(db)
+        stats = await book_service.get_rating_stats(book_id)
+        if not stats:
+            raise BookNotFoundError(book_id)
+        return stats
+    except BookNotFoundError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.profiling import debug_access_allowed
+from app.query_stats import QueryStats, query_stats
+
+router = APIRouter()
+
+
+def require_debug_access(request: Request):
+    """Debug routes exist only in DEBUG or for holders of the profile token"""
+    if not debug_access_allowed(request.scope):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/queries", dependencies=[Depends(require_debug_access)])
+async def get_query_stats(
+    sort: str = Query("total", pattern=f"^({'|'.join(QueryStats.SORT_KEYS)})$"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Aggregated statistics per SQL fingerprint for this worker"""
+    return {"fingerprints": len(query_stats), "queries": query_stats.snapshot(sort=sort, limit=limit)}
+
+
+@router.delete("/queries", status_code=204, dependencies=[Depends(require_debug_access)])
+async def reset_query_stats():
+    """Clear the query statistics of this worker"""
+    query_stats.reset()
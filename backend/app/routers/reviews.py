@@ -1,55 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
 
-from app.database import get_db
+from app.database import get_async_db
 from app.schemas.review import ReviewCreate, ReviewResponse, ReviewList
+from app.schemas.bulk import BulkResult
 from app.services.review_service import ReviewService
 from app.services.book_service import BookService
 from app.exceptions import BookNotFoundError
+from app.utils.helpers import dump_json, parse_fields, sparse_exclude
+from app.utils.streaming import iter_records, export_response
+from app.utils.http_cache import Validators, make_etag
 
 router = APIRouter()
 
+# Routes that span many books, mounted under /reviews
+bulk_router = APIRouter()
+
 
 @router.get("/{book_id}/reviews", response_model=ReviewList)
 async def get_book_reviews(
     book_id: int,
+    request: Request,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from next_cursor; enables keyset pagination"),
+    include_total: bool = Query(False, description="Also count all reviews in cursor mode"),
+    fields: Optional[str] = Query(None, description="Comma-separated review fields to return, e.g. id,rating"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all reviews for a specific book"""
     try:
+        review_fields = parse_fields(fields, ReviewResponse)
         # Check if book exists
         book_service = BookService(db)
-        book = book_service.get_book_by_id(book_id)
+        book = await book_service.get_book_cached(book_id)
         if not book:
             raise BookNotFoundError(book_id)
         
+        # Every review write updates the book's aggregates, and so its updated_at
+        validators = Validators(
+            make_etag("reviews", book_id, book.updated_at, page, per_page, cursor, include_total, review_fields),
+            book.updated_at,
+        )
+        if validators.matches(request):
+            return validators.not_modified()
+        
         review_service = ReviewService(db)
-        result = review_service.get_reviews_by_book(
-            book_id=book_id, 
-            page=page, 
-            per_page=per_page
+        if cursor is not None:
+            result = await review_service.get_reviews_by_cursor(
+                book_id=book_id,
+                cursor=cursor,
+                per_page=per_page,
+                include_total=include_total,
+                fields=review_fields
+            )
+        else:
+            result = await review_service.get_reviews_by_book(
+                book_id=book_id, 
+                page=page, 
+                per_page=per_page,
+                fields=review_fields
+            )
+        # Built from trusted DB rows, so skip response_model validation
+        return Response(
+            content=dump_json(result, exclude=sparse_exclude("reviews", ReviewResponse, review_fields)),
+            media_type="application/json",
+            headers=validators.headers(),
         )
-        return result
     except BookNotFoundError:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{book_id}/reviews/export")
+async def export_book_reviews(
+    book_id: int,
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    updated_since: Optional[datetime] = Query(None, description="Only reviews updated at or after this time"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream all reviews of a book as NDJSON or CSV"""
+    book_service = BookService(db)
+    book = await book_service.get_book_cached(book_id)
+    if not book:
+        raise BookNotFoundError(book_id)
+    
+    review_service = ReviewService(db)
+    partitions = review_service.export_reviews(book_id=book_id, updated_since=updated_since)
+    return export_response(partitions, export_format, ReviewResponse, filename=f"book-{book_id}-reviews")
+
+
 @router.post("/{book_id}/reviews", response_model=ReviewResponse, status_code=201)
 async def create_review(
     book_id: int,
     review: ReviewCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a new review to a book"""
     try:
         # Check if book exists
         book_service = BookService(db)
-        book = book_service.get_book_by_id(book_id)
+        book = await book_service.get_book_cached(book_id)
         if not book:
             raise BookNotFoundError(book_id)
         
@@ -61,4 +117,18 @@ async def create_review(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@bulk_router.post("/bulk", response_model=BulkResult)
+async def import_reviews(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk import reviews for many books from a streamed NDJSON or CSV (text/csv) body"""
+    try:
+        review_service = ReviewService(db)
+        records = iter_records(request.stream(), request.headers.get("content-type", ""))
+        return await review_service.import_reviews(records)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
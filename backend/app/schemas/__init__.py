@@ -1,7 +1,9 @@
-from app.schemas.book import BookCreate, BookResponse, BookList
-from app.schemas.review import ReviewCreate, ReviewResponse, ReviewList
+from app.schemas.book import BookCreate, BookResponse, BookList, AutocompleteSuggestion
+from app.schemas.review import ReviewCreate, ReviewImport, ReviewResponse, ReviewList
+from app.schemas.bulk import BulkRowError, BulkResult
 
 __all__ = [
-    "BookCreate", "BookResponse", "BookList",
-    "ReviewCreate", "ReviewResponse", "ReviewList"
-]
\ No newline at end of file
+    "BookCreate", "BookResponse", "BookList", "AutocompleteSuggestion",
+    "ReviewCreate", "ReviewImport", "ReviewResponse", "ReviewList",
+    "BulkRowError", "BulkResult"
+]
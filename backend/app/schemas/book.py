@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -8,7 +8,7 @@ class BookBase(BaseModel):
     author: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
     isbn: Optional[str] = Field(None, min_length=10, max_length=13)
-    published_year: Optional[int] = Field(None, ge=1000, le=2024)
+    published_year: Optional[int] = Field(None, ge=1000)
 
 
 class BookCreate(BookBase):
@@ -18,10 +18,17 @@ class BookCreate(BookBase):
             raise ValueError('ISBN must be 10 or 13 digits')
         return v
 
+    @validator('published_year')
+    def validate_published_year(cls, v):
+        if v is not None and v > datetime.now().year:
+            raise ValueError('Published year cannot be in the future')
+        return v
+
 
 class BookResponse(BookBase):
     id: int
     average_rating: float
+    review_count: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -31,6 +38,29 @@ class BookResponse(BookBase):
 
 class BookList(BaseModel):
     books: List[BookResponse]
-    total: int
-    page: int = 1
-    per_page: int = 50
\ No newline at end of file
+    total: Optional[int] = None
+    page: Optional[int] = 1
+    per_page: int = 50
+    next_cursor: Optional[str] = None
+
+
+class BookBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class BookBatch(BaseModel):
+    books: List[BookResponse]  # in request order, duplicates dropped
+    missing: List[int] = []  # requested ids with no book
+
+
+class BookStats(BaseModel):
+    book_id: int
+    review_count: int
+    average_rating: float
+    histogram: Dict[int, int]  # whole stars -> number of reviews
+
+
+class AutocompleteSuggestion(BaseModel):
+    text: str
+    field: str  # "title" or "author"
+    book_id: Optional[int] = None  # set for titles
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class BulkResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
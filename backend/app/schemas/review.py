@@ -17,6 +17,10 @@ class ReviewCreate(ReviewBase):
         return round(v, 1)  # Round to 1 decimal place
 
 
+class ReviewImport(ReviewCreate):
+    book_id: int
+
+
 class ReviewResponse(ReviewBase):
     id: int
     book_id: int
@@ -29,7 +33,8 @@ class ReviewResponse(ReviewBase):
 
 class ReviewList(BaseModel):
     reviews: List[ReviewResponse]
-    total: int
+    total: Optional[int] = None
     book_id: int
-    page: int = 1
-    per_page: int = 50
\ No newline at end of file
+    page: Optional[int] = 1
+    per_page: int = 50
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,97 +1,625 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Numeric, bindparam, case, cast, column, func, insert, literal_column, or_, select, table, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from pydantic import ValidationError
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
 import json
+import re
 
-from app.models.book import Book
-from app.schemas.book import BookCreate, BookResponse, BookList
-from app.cache import get_cache, set_cache, delete_cache
+from app.config import settings
+from app.models.book import Book, STAR_BUCKETS, star_bucket, star_bucket_clause, star_column
+from app.schemas.book import (
+    BookCreate, BookResponse, BookList, BookBatch, BookStats
+)
+from app.schemas.bulk import BulkRowError, BulkResult
+from app.cache import (
+    get_cache, set_cache, get_cache_many, delete_cache, delete_cache_many, get_or_load, get_versions,
+    set_cache_unless_invalidated, get_generation, bump_generation
+)
+from app.utils.helpers import (
+    Fields, encode_cursor, decode_cursor, construct_model, dump_json, format_validation_errors, sparse_exclude
+)
+from app.utils.streaming import Record
+from app.autocomplete import add_to_autocomplete
+from app.leaderboard import Rating, set_ratings, top_rated
+from app.jobs import job_queue
+from app.compression import compress
+
+
+BOOKS_CACHE_NAMESPACE = "books"
+BOOK_CACHE_KEY = "book:{book_id}"
+BUMP_GENERATION_JOB = "bump_generation"
+BULK_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_BATCH_IDS = 100
 
 
 class BookService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_book_by_id(self, book_id: int) -> Optional[Book]:
-        """Get a book by ID"""
-        return self.db.query(Book).filter(Book.id == book_id).first()
+    async def get_book_by_id(self, book_id: int) -> Optional[Book]:
+        """Get a book by ID from the primary"""
+        result = await self.db.execute(select(Book).where(Book.id == book_id))
+        return result.scalars().first()
+    
+    async def get_book_cached(self, book_id: int) -> Optional[BookResponse]:
+        """Get a book by ID through the read-through cache.
+        
+        Misses are loaded from the primary: the miss may follow the very
+        write that invalidated the key, and a lagging replica's row would
+        then be served to every client for CACHE_TTL.
+        """
+        async def load():
+            book = await self.get_book_by_id(book_id)
+            return BookResponse.model_validate(book).model_dump(mode="json") if book else None
+        
+        cached = await get_or_load(BOOK_CACHE_KEY.format(book_id=book_id), load)
+        return BookResponse(**cached) if cached else None
+    
+    async def get_books_by_ids(self, book_ids: List[int]) -> BookBatch:
+        """Get many books by ID, in request order, sharing the per-book cache entries.
+        
+        Cached books come from one MGET; the rest are loaded from the
+        primary with one IN query and written back in one transaction,
+        minus any invalidated while they were loading.
+        """
+        book_ids = list(dict.fromkeys(book_ids))
+        if len(book_ids) > MAX_BATCH_IDS:
+            raise ValueError(f"At most {MAX_BATCH_IDS} ids per batch")
+        
+        keys = [BOOK_CACHE_KEY.format(book_id=book_id) for book_id in book_ids]
+        found = dict(zip(book_ids, await get_cache_many(keys)))
+        misses = [book_id for book_id, cached in found.items() if cached is None]
+        if misses:
+            miss_keys = [BOOK_CACHE_KEY.format(book_id=book_id) for book_id in misses]
+            # Read before loading, like get_or_load, so books written meanwhile aren't cached
+            versions = dict(zip(miss_keys, await get_versions(miss_keys)))
+            result = await self.db.execute(select(Book).where(Book.id.in_(misses)))
+            loaded = {
+                book.id: BookResponse.model_validate(book).model_dump(mode="json") for book in result.scalars()
+            }
+            found.update(loaded)
+            await set_cache_unless_invalidated(
+                {BOOK_CACHE_KEY.format(book_id=book_id): book for book_id, book in loaded.items()}, versions
+            )
+        
+        return BookBatch.model_construct(
+            books=[BookResponse(**found[book_id]) for book_id in book_ids if found[book_id]],
+            missing=[book_id for book_id in book_ids if not found[book_id]],
+        )
     
-    def get_books(self, page: int = 1, per_page: int = 50) -> BookList:
-        """Get books with pagination"""
+    async def get_books(self, page: int = 1, per_page: int = 50, fields: Fields = None) -> BookList:
+        """Get books with pagination; fields limits the columns loaded and returned.
+        
+        Reads the primary, since these pages are what get_books_cached stores.
+        """
         offset = (page - 1) * per_page
         
-        books = self.db.query(Book).offset(offset).limit(per_page).all()
-        total = self.db.query(Book).count()
+        result = await self.db.execute(
+            _select_books(fields).order_by(Book.id).offset(offset).limit(per_page)
+        )
+        books = result.scalars().all()
+        total = await self.db.scalar(select(func.count()).select_from(Book))
         
-        return BookList(
-            books=books,
+        return BookList.model_construct(
+            books=[construct_model(BookResponse, book, fields) for book in books],
             total=total,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            next_cursor=self._next_cursor(books) if offset + len(books) < total else None
+        )
+    
+    async def get_books_by_cursor(
+        self, cursor: str = "", per_page: int = 50, include_total: bool = False, fields: Fields = None
+    ) -> BookList:
+        """Get books with keyset pagination ordered by id"""
+        query = _select_books(fields).order_by(Book.id).limit(per_page + 1).execution_options(use_replica=True)
+        if cursor:
+            values = decode_cursor(cursor)
+            if not isinstance(values.get("id"), int):
+                raise ValueError("Invalid cursor")
+            query = query.where(Book.id > values["id"])
+        
+        result = await self.db.execute(query)
+        books = result.scalars().all()
+        has_more = len(books) > per_page
+        books = books[:per_page]
+        
+        total = None
+        if include_total:
+            total = await self.db.scalar(
+                select(func.count()).select_from(Book).execution_options(use_replica=True)
+            )
+        
+        return BookList.model_construct(
+            books=[construct_model(BookResponse, book, fields) for book in books],
+            total=total,
+            page=None,
+            per_page=per_page,
+            next_cursor=self._next_cursor(books) if has_more else None
         )
     
-    async def get_books_cached(self, page: int = 1, per_page: int = 50) -> BookList:
-        """Get books with caching"""
-        cache_key = f"books:page:{page}:per_page:{per_page}"
+    async def get_books_cached(
+        self, generation: int, page: int = 1, per_page: int = 50, encoding: Optional[str] = None,
+        fields: Fields = None
+    ) -> Tuple[bytes, Optional[str]]:
+        """Get a page of books as JSON bytes, served from cache when possible.
+        
+        generation is the one returned by get_books_validator, so the page
+        and its ETag are keyed by the same read. With an encoding negotiated
+        from Accept-Encoding, the page is compressed once and cached next to
+        the raw bytes, so hits never compress again. Returns (body, content coding of the body), the
+        coding being None for pages under COMPRESSION_MIN_SIZE.
+        """
+        cache_key = f"{BOOKS_CACHE_NAMESPACE}:gen:{generation}:page:{page}:per_page:{per_page}"
+        if fields:
+            cache_key += f":fields:{','.join(fields)}"
+        
+        if encoding:
+            compressed = await get_cache(f"{cache_key}:{encoding}", raw=True)
+            if compressed:
+                return compressed, encoding
         
         # Try to get from cache
-        cached_result = await get_cache(cache_key)
-        if cached_result:
-            return BookList(**cached_result)
+        result = await get_cache(cache_key, raw=True)
+        if not result:
+            # Cache miss - fetch from database
+            result = dump_json(
+                await self.get_books(page, per_page, fields), exclude=sparse_exclude("books", BookResponse, fields)
+            )
+            await set_cache(cache_key, result, raw=True)
         
-        # Cache miss - fetch from database
-        result = self.get_books(page, per_page)
+        if encoding and len(result) >= settings.COMPRESSION_MIN_SIZE:
+            compressed = compress(result, encoding)
+            await set_cache(f"{cache_key}:{encoding}", compressed, raw=True)
+            return compressed, encoding
+        return result, None
+    
+    async def get_books_validator(self) -> Tuple[int, Optional[datetime]]:
+        """Cache generation and latest updated_at of the catalog, for list ETags.
         
-        # Convert to dict for caching
-        result_dict = {
-            "books": [book.__dict__ for book in result.books],
-            "total": result.total,
-            "page": result.page,
-            "per_page": result.per_page
-        }
+        Every book or rating write moves max(updated_at), which
+        ix_books_updated_at_id answers without a scan. It is read from the
+        primary and cached with the list pages, so revalidating a page
+        needs no query and a replica's lag can't produce a false 304.
+        """
+        generation = await get_generation(BOOKS_CACHE_NAMESPACE)
         
-        # Clean SQLAlchemy internal attributes
-        for book in result_dict["books"]:
-            book.pop("_sa_instance_state", None)
+        async def load():
+            last_modified = await self.db.scalar(select(func.max(Book.updated_at)))
+            return last_modified.isoformat() if last_modified else ""
         
-        # Set cache
-        await set_cache(cache_key, result_dict)
+        cached = await get_or_load(f"{BOOKS_CACHE_NAMESPACE}:gen:{generation}:last_modified", load)
+        return generation, datetime.fromisoformat(cached) if cached else None
+    
+    async def search_books(self, q: str, page: int = 1, per_page: int = 50) -> BookList:
+        """Full-text search over title, author and description, best match first"""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            ts_query = func.websearch_to_tsquery("english", q)
+            search_vector = literal_column("books.search_vector")
+            condition = search_vector.op("@@")(ts_query)
+            query = select(Book).where(condition).order_by(
+                func.ts_rank_cd(search_vector, ts_query).desc(), Book.id
+            )
+            count_query = select(func.count()).select_from(Book).where(condition)
+        elif dialect == "sqlite":
+            # Quote every word so user input can't use FTS5 query syntax
+            match = " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+            if not match:
+                return BookList.model_construct(books=[], total=0, page=page, per_page=per_page)
+            books_fts = table("books_fts", column("rowid"))
+            condition = text("books_fts MATCH :match").bindparams(match=match)
+            query = (
+                select(Book)
+                .join(books_fts, books_fts.c.rowid == Book.id)
+                .where(condition)
+                # Weight title/author above description, like the Postgres setweight
+                .order_by(literal_column("bm25(books_fts, 10.0, 10.0, 1.0)"), Book.id)
+            )
+            count_query = (
+                select(func.count())
+                .select_from(books_fts)
+                .where(condition)
+            )
+        else:
+            pattern = f"%{q}%"
+            condition = or_(
+                Book.title.ilike(pattern), Book.author.ilike(pattern), Book.description.ilike(pattern)
+            )
+            query = select(Book).where(condition).order_by(Book.id)
+            count_query = select(func.count()).select_from(Book).where(condition)
         
-        return result
+        offset = (page - 1) * per_page
+        result = await self.db.execute(query.offset(offset).limit(per_page))
+        books = result.scalars().all()
+        total = await self.db.scalar(count_query)
+        
+        return BookList.model_construct(
+            books=[construct_model(BookResponse, book) for book in books],
+            total=total,
+            page=page,
+            per_page=per_page
+        )
+    
+    async def get_top_books(self, min_reviews: int = 1, limit: int = 10) -> List[BookResponse]:
+        """Best-rated books, ranked by the leaderboard and loaded with one IN query"""
+        ranked = await top_rated(min_reviews=min_reviews, limit=limit)
+        if not ranked:
+            return []
+        
+        result = await self.db.execute(
+            select(Book).where(Book.id.in_([book_id for book_id, _ in ranked]))
+            .execution_options(use_replica=True)
+        )
+        books = {book.id: book for book in result.scalars()}
+        return [construct_model(BookResponse, books[book_id]) for book_id, _ in ranked if book_id in books]
+    
+    async def export_books(
+        self, updated_since: Optional[datetime] = None
+    ) -> AsyncIterator[List[BookResponse]]:
+        """Stream every book in partitions through a server-side cursor.
+        
+        Incremental exports come in (updated_at, id) order so they can be
+        served from ix_books_updated_at_id.
+        """
+        query = select(Book).order_by(Book.id)
+        if updated_since:
+            query = (
+                select(Book)
+                .where(Book.updated_at >= updated_since)
+                .order_by(Book.updated_at, Book.id)
+            )
+        
+        result = await self.db.stream_scalars(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield [construct_model(BookResponse, book) for book in partition]
     
     async def create_book(self, book_data: BookCreate) -> Book:
         """Create a new book"""
         # Check if ISBN already exists
         if book_data.isbn:
-            existing = self.db.query(Book).filter(Book.isbn == book_data.isbn).first()
+            existing = await self.db.scalar(select(Book.id).where(Book.isbn == book_data.isbn))
             if existing:
                 raise ValueError(f"Book with ISBN {book_data.isbn} already exists")
         
         book = Book(**book_data.dict())
         self.db.add(book)
-        self.db.commit()
-        self.db.refresh(book)
+        await self.db.commit()
+        await self.db.refresh(book)
         
         await self._invalidate_books_cache()
+        await add_to_autocomplete([(book.id, book.title, book.author)])
         
         return book
     
-    def update_average_rating(self, book_id: int):
-        """Update the average rating for a book"""
+    async def import_books(self, records: AsyncIterator[Tuple[int, Record]]) -> BulkResult:
+        """Validate and insert books from a stream of records in batches.
+        
+        Each batch costs one ISBN lookup and one multi-row INSERT. Invalid
+        or duplicate rows are reported per row instead of failing the import.
+        """
+        result = BulkResult()
+        seen_isbns: Set[str] = set()
+        created: List[Tuple[int, str, str]] = []
+        batch = []
+        try:
+            async for row, record in records:
+                batch.append((row, record))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    created.extend(await self._import_book_batch(batch, seen_isbns, result))
+                    batch = []
+            if batch:
+                created.extend(await self._import_book_batch(batch, seen_isbns, result))
+        finally:
+            # Batches committed before a failure or disconnect stay imported
+            if created:
+                await self._invalidate_books_cache()
+                await add_to_autocomplete(created)
+        
+        result.errors.sort(key=lambda error: error.row)
+        result.failed = len(result.errors)
+        return result
+    
+    async def _import_book_batch(
+        self, batch: List[Tuple[int, Record]], seen_isbns: Set[str], result: BulkResult
+    ) -> List[Tuple[int, str, str]]:
+        """Validate, de-duplicate and insert one batch of import rows.
+        
+        Returns (id, title, author) for every book created.
+        """
+        valid = []
+        for row, record in batch:
+            if isinstance(record, Exception):
+                result.errors.append(BulkRowError(row=row, errors=[str(record)]))
+                continue
+            try:
+                book = BookCreate.model_validate(record)
+            except ValidationError as e:
+                result.errors.append(BulkRowError(row=row, errors=format_validation_errors(e)))
+                continue
+            if book.isbn:
+                if book.isbn in seen_isbns:
+                    result.errors.append(BulkRowError(
+                        row=row, errors=[f"Duplicate ISBN {book.isbn} in upload"]
+                    ))
+                    continue
+                seen_isbns.add(book.isbn)
+            valid.append((row, book))
+        
+        isbns = [book.isbn for _, book in valid if book.isbn]
+        existing = set()
+        if isbns:
+            existing = set(await self.db.scalars(select(Book.isbn).where(Book.isbn.in_(isbns))))
+        
+        rows = []
+        for row, book in valid:
+            if book.isbn in existing:
+                result.errors.append(BulkRowError(
+                    row=row, errors=[f"Book with ISBN {book.isbn} already exists"]
+                ))
+            else:
+                rows.append((row, book))
+        if not rows:
+            return []
+        
+        created = []
+        insert_books = insert(Book).returning(Book.id, Book.title, Book.author)
+        try:
+            inserted = await self.db.execute(insert_books, [book.model_dump() for _, book in rows])
+            created = [tuple(book) for book in inserted]
+            await self.db.commit()
+            result.created += len(rows)
+        except IntegrityError:
+            # A concurrent writer took one of the ISBNs; fall back to row by row
+            await self.db.rollback()
+            created = []
+            for row, book in rows:
+                try:
+                    inserted = await self.db.execute(insert_books, [book.model_dump()])
+                    created.extend(tuple(book) for book in inserted)
+                    await self.db.commit()
+                    result.created += 1
+                except IntegrityError:
+                    await self.db.rollback()
+                    result.errors.append(BulkRowError(
+                        row=row, errors=[f"Book with ISBN {book.isbn} already exists"]
+                    ))
+        return created
+    
+    async def add_rating(self, book_id: int, rating: float) -> Optional[Tuple[float, int]]:
+        """Fold a new rating into the book's aggregates and star histogram.
+        
+        A single UPDATE in the caller's transaction, so concurrent reviews
+        can't lose each other's increments. Returns the new (rating_sum,
+        review_count), or None if the book doesn't exist. The caller commits.
+        """
+        result = await self.db.execute(
+            update(Book)
+            .where(Book.id == book_id)
+            .values(
+                review_count=Book.review_count + 1,
+                rating_sum=Book.rating_sum + rating,
+                average_rating=func.round(
+                    cast((Book.rating_sum + rating) / (Book.review_count + 1), Numeric), 1
+                ),
+                **{f"stars_{star_bucket(rating)}": star_column(star_bucket(rating)) + 1},
+            )
+            .returning(Book.rating_sum, Book.review_count)
+        )
+        row = result.one_or_none()
+        return tuple(row) if row else None
+    
+    async def add_ratings(self, ratings: Iterable[Tuple[int, float]]) -> List[Rating]:
+        """Fold many new (book_id, rating) pairs into their books' aggregates and histograms.
+        
+        The ratings are grouped per book here and added with one executemany
+        UPDATE, so the cost follows the new ratings rather than the books'
+        existing reviews. Returns the new (id, rating_sum, review_count) of
+        each book. The caller commits.
+        """
+        deltas = {}
+        for book_id, rating in ratings:
+            delta = deltas.setdefault(book_id, {
+                "delta_book_id": book_id, "delta_count": 0, "delta_sum": 0.0,
+                **{f"delta_stars_{stars}": 0 for stars in STAR_BUCKETS},
+            })
+            delta["delta_count"] += 1
+            delta["delta_sum"] += rating
+            delta[f"delta_stars_{star_bucket(rating)}"] += 1
+        if not deltas:
+            return []
+        
+        count, rating_sum = bindparam("delta_count"), bindparam("delta_sum")
+        # Core executemany on the session's connection: the ORM would treat a
+        # list of parameters as a bulk UPDATE by primary key
+        connection = await self.db.connection()
+        await connection.execute(
+            update(Book)
+            .where(Book.id == bindparam("delta_book_id"))
+            .values(
+                review_count=Book.review_count + count,
+                rating_sum=Book.rating_sum + rating_sum,
+                average_rating=func.round(
+                    cast((Book.rating_sum + rating_sum) / (Book.review_count + count), Numeric), 1
+                ),
+                **{f"stars_{stars}": star_column(stars) + bindparam(f"delta_stars_{stars}") for stars in STAR_BUCKETS},
+            ),
+            list(deltas.values()),
+        )
+        result = await self.db.execute(
+            select(Book.id, Book.rating_sum, Book.review_count)
+            .where(Book.id.in_(deltas))
+            .order_by(Book.id)
+        )
+        return [tuple(row) for row in result]
+    
+    async def recompute_ratings(self, book_ids: Iterable[int]) -> List[Rating]:
+        """Recompute rating aggregates and histograms for many books from their reviews.
+        
+        One grouped UPDATE ... FROM (SELECT book_id, ... GROUP BY book_id)
+        per chunk of ids, in the caller's transaction. Returns the new
+        (id, rating_sum, review_count) of each book. The caller commits.
+        """
+        from app.models.review import Review
+        
+        ratings = []
+        book_ids = list(book_ids)
+        for start in range(0, len(book_ids), BULK_BATCH_SIZE):
+            chunk = book_ids[start:start + BULK_BATCH_SIZE]
+            stats = (
+                select(
+                    Review.book_id,
+                    func.count(Review.id).label("review_count"),
+                    func.sum(Review.rating).label("rating_sum"),
+                    func.avg(Review.rating).label("average_rating"),
+                    *_star_counts(Review.rating),
+                )
+                .where(Review.book_id.in_(chunk))
+                .group_by(Review.book_id)
+                .subquery()
+            )
+            result = await self.db.execute(
+                update(Book)
+                .where(Book.id == stats.c.book_id)
+                .values(
+                    review_count=stats.c.review_count,
+                    rating_sum=stats.c.rating_sum,
+                    average_rating=func.round(cast(stats.c.average_rating, Numeric), 1),
+                    **{f"stars_{stars}": stats.c[f"stars_{stars}"] for stars in STAR_BUCKETS},
+                )
+                .returning(Book.id, Book.rating_sum, Book.review_count)
+                .execution_options(synchronize_session=False)
+            )
+            ratings.extend(tuple(row) for row in result)
+        return ratings
+    
+    async def update_average_rating(self, book_id: int):
+        """Recompute a book's rating aggregates from all of its reviews"""
         from app.models.review import Review
         
-        avg_rating = self.db.query(func.avg(Review.rating)).filter(
-            Review.book_id == book_id
-        ).scalar()
+        result = await self.db.execute(
+            select(
+                func.count(Review.id),
+                func.coalesce(func.sum(Review.rating), 0.0),
+                *_star_counts(Review.rating),
+            )
+            .where(Review.book_id == book_id)
+        )
+        review_count, rating_sum, *star_counts = result.one()
         
-        book = self.get_book_by_id(book_id)
+        book = await self.get_book_by_id(book_id)
         if book:
-            book.average_rating = round(avg_rating or 0.0, 1)
-            self.db.commit()
+            book.review_count = review_count
+            book.rating_sum = rating_sum
+            book.average_rating = round(rating_sum / review_count, 1) if review_count else 0.0
+            for stars, count in zip(STAR_BUCKETS, star_counts):
+                setattr(book, f"stars_{stars}", count or 0)
+            await self.db.commit()
+            
+            await set_ratings([(book_id, rating_sum, review_count)])
+            await self._invalidate_book_caches([book_id])
+            self._schedule_books_cache_invalidation()
+    
+    async def rebuild_rating_aggregates(self) -> int:
+        """Recompute the aggregates and histogram of every book from its reviews.
+        
+        Walks the books in id batches, one transaction each; aggregates of
+        books left without reviews are reset and each batch's cache entries
+        are dropped once it commits. Returns the number of books.
+        """
+        rebuilt = 0
+        last_id = 0
+        while True:
+            book_ids = list(await self.db.scalars(
+                select(Book.id).where(Book.id > last_id).order_by(Book.id).limit(BULK_BATCH_SIZE)
+            ))
+            if not book_ids:
+                return rebuilt
+            
+            await self.db.execute(
+                update(Book)
+                .where(Book.id.in_(book_ids), Book.review_count > 0)
+                .values(
+                    review_count=0,
+                    rating_sum=0.0,
+                    average_rating=0.0,
+                    **{f"stars_{stars}": 0 for stars in STAR_BUCKETS},
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.recompute_ratings(book_ids)
+            await self.db.commit()
+            await self._invalidate_book_caches(book_ids)
+            rebuilt += len(book_ids)
+            last_id = book_ids[-1]
+    
+    async def get_rating_stats(self, book_id: int) -> Optional[BookStats]:
+        """Star histogram, mean and review count, read from the book's aggregates only.
+        
+        The mean is the stored average_rating, so it always matches the one
+        /books/{book_id} reports.
+        """
+        result = await self.db.execute(
+            select(Book.review_count, Book.average_rating, *(star_column(stars) for stars in STAR_BUCKETS))
+            .where(Book.id == book_id)
+            .execution_options(use_replica=True)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        review_count, average_rating, *star_counts = row
+        return BookStats(
+            book_id=book_id,
+            review_count=review_count,
+            average_rating=average_rating if review_count else 0.0,
+            histogram=dict(zip(STAR_BUCKETS, star_counts)),
+        )
+    
+    @staticmethod
+    def _next_cursor(books: List[Book]) -> Optional[str]:
+        """Build the cursor that continues after the last book"""
+        return encode_cursor({"id": books[-1].id}) if books else None
+    
+    async def _invalidate_book_cache(self, book_id: int):
+        """Invalidate the cache entry of a single book"""
+        await delete_cache(BOOK_CACHE_KEY.format(book_id=book_id))
+    
+    async def _invalidate_book_caches(self, book_ids: Iterable[int]):
+        """Invalidate the cache entries of many books at once"""
+        await delete_cache_many([BOOK_CACHE_KEY.format(book_id=book_id) for book_id in book_ids])
     
     async def _invalidate_books_cache(self):
         """Invalidate all books cache entries"""
-        for page in range(1, 10): 
-            for per_page in [10, 25, 50, 100]:
-                cache_key = f"books:page:{page}:per_page:{per_page}"
-                await delete_cache(cache_key)
\ No newline at end of file
+        await bump_generation(BOOKS_CACHE_NAMESPACE)
+    
+    def _schedule_books_cache_invalidation(self):
+        """Invalidate all books cache entries in the background, once per burst of writes"""
+        job_queue.submit(BUMP_GENERATION_JOB, BOOKS_CACHE_NAMESPACE)
+
+
+def _star_counts(rating) -> List:
+    """Per-bucket review counts for a grouped SELECT, labelled like the histogram columns"""
+    return [
+        func.sum(case((star_bucket_clause(rating) == stars, 1), else_=0)).label(f"stars_{stars}")
+        for stars in STAR_BUCKETS
+    ]
+
+
+def _select_books(fields: Fields):
+    """SELECT of books loading only the requested columns, and the primary key"""
+    query = select(Book)
+    if fields:
+        query = query.options(load_only(*(getattr(Book, name) for name in fields)))
+    return query
+
+
+async def _bump_generations(namespaces: Set[str]):
+    for namespace in namespaces:
+        await bump_generation(namespace)
+
+
+job_queue.register(BUMP_GENERATION_JOB, _bump_generations)
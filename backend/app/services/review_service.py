@@ -1,54 +1,214 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import load_only
+from pydantic import ValidationError
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
 
+from app.models.book import Book
 from app.models.review import Review
-from app.schemas.review import ReviewCreate, ReviewResponse, ReviewList
-from app.services.book_service import BookService
+from app.schemas.review import ReviewCreate, ReviewImport, ReviewResponse, ReviewList
+from app.schemas.bulk import BulkRowError, BulkResult
+from app.services.book_service import BookService, BULK_BATCH_SIZE, EXPORT_BATCH_SIZE
+from app.leaderboard import Rating, record_rating, set_ratings
+from app.utils.helpers import Fields, encode_cursor, decode_cursor, construct_model, format_validation_errors
+from app.utils.streaming import Record
 
 
 class ReviewService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_review_by_id(self, review_id: int) -> Optional[Review]:
+    async def get_review_by_id(self, review_id: int) -> Optional[Review]:
         """Get a review by ID"""
-        return self.db.query(Review).filter(Review.id == review_id).first()
+        result = await self.db.execute(select(Review).where(Review.id == review_id))
+        return result.scalars().first()
     
-    def get_reviews_by_book(self, book_id: int, page: int = 1, per_page: int = 50) -> ReviewList:
-        """Get reviews for a specific book with pagination"""
+    async def get_reviews_by_book(
+        self, book_id: int, page: int = 1, per_page: int = 50, fields: Fields = None
+    ) -> ReviewList:
+        """Get reviews for a specific book with pagination; fields limits the columns loaded and returned"""
         offset = (page - 1) * per_page
         
-        reviews = (
-            self.db.query(Review)
-            .filter(Review.book_id == book_id)
-            .order_by(Review.created_at.desc())
+        result = await self.db.execute(
+            _select_reviews(fields)
+            .where(Review.book_id == book_id)
+            .order_by(Review.created_at.desc(), Review.id.desc())
             .offset(offset)
             .limit(per_page)
-            .all()
+            .execution_options(use_replica=True)
         )
+        reviews = result.scalars().all()
         
-        total = self.db.query(Review).filter(Review.book_id == book_id).count()
+        total = await self._count_reviews(book_id)
         
-        return ReviewList(
-            reviews=reviews,
+        return ReviewList.model_construct(
+            reviews=[construct_model(ReviewResponse, review, fields) for review in reviews],
             total=total,
             book_id=book_id,
             page=page,
-            per_page=per_page
+            per_page=per_page,
+            next_cursor=self._next_cursor(reviews) if offset + len(reviews) < total else None
         )
     
+    async def get_reviews_by_cursor(
+        self, book_id: int, cursor: str = "", per_page: int = 50, include_total: bool = False,
+        fields: Fields = None
+    ) -> ReviewList:
+        """Get reviews for a book with keyset pagination, newest first"""
+        query = (
+            _select_reviews(fields)
+            .where(Review.book_id == book_id)
+            .order_by(Review.created_at.desc(), Review.id.desc())
+            .limit(per_page + 1)
+            .execution_options(use_replica=True)
+        )
+        if cursor:
+            values = decode_cursor(cursor)
+            try:
+                created_at = datetime.fromisoformat(values["created_at"])
+                review_id = int(values["id"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+            query = query.where(
+                tuple_(Review.created_at, Review.id) < (created_at, review_id)
+            )
+        
+        result = await self.db.execute(query)
+        reviews = result.scalars().all()
+        has_more = len(reviews) > per_page
+        reviews = reviews[:per_page]
+        
+        total = await self._count_reviews(book_id) if include_total else None
+        
+        return ReviewList.model_construct(
+            reviews=[construct_model(ReviewResponse, review, fields) for review in reviews],
+            total=total,
+            book_id=book_id,
+            page=None,
+            per_page=per_page,
+            next_cursor=self._next_cursor(reviews) if has_more else None
+        )
+    
+    async def export_reviews(
+        self, book_id: int, updated_since: Optional[datetime] = None
+    ) -> AsyncIterator[List[ReviewResponse]]:
+        """Stream a book's reviews in partitions through a server-side cursor"""
+        query = select(Review).where(Review.book_id == book_id).order_by(Review.id)
+        if updated_since:
+            query = query.where(Review.updated_at >= updated_since)
+        
+        result = await self.db.stream_scalars(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield [construct_model(ReviewResponse, review) for review in partition]
+    
+    async def _count_reviews(self, book_id: int) -> int:
+        """Count the reviews of a book"""
+        return await self.db.scalar(
+            select(func.count()).select_from(Review).where(Review.book_id == book_id)
+            .execution_options(use_replica=True)
+        )
+    
+    @staticmethod
+    def _next_cursor(reviews: List[Review]) -> Optional[str]:
+        """Build the cursor that continues after the last review"""
+        if not reviews:
+            return None
+        last = reviews[-1]
+        return encode_cursor({"created_at": last.created_at, "id": last.id})
+    
     async def create_review(self, book_id: int, review_data: ReviewCreate) -> Review:
         """Create a new review for a book"""
         review = Review(book_id=book_id, **review_data.dict())
         self.db.add(review)
-        self.db.commit()
-        self.db.refresh(review)
         
-        # Update book's average rating
+        # Update book's rating aggregates in the same transaction
         book_service = BookService(self.db)
-        book_service.update_average_rating(book_id)
+        aggregates = await book_service.add_rating(book_id, review.rating)
+        await self.db.commit()
+        await self.db.refresh(review)
+        
+        if aggregates:
+            await record_rating(book_id, review.rating, *aggregates)
+        
+        # The book itself is read back right away, so drop it now; list
+        # pages only show the rating and can follow once per burst
+        await book_service._invalidate_book_cache(book_id)
+        book_service._schedule_books_cache_invalidation()
         
-        # Invalidate books cache since average rating changed
-        await book_service._invalidate_books_cache()
+        return review
+    
+    async def import_reviews(self, records: AsyncIterator[Tuple[int, Record]]) -> BulkResult:
+        """Validate and insert reviews for many books from a stream of records.
+        
+        Each batch costs one set-based book id check, one multi-row INSERT
+        and one UPDATE adding the batch's per-book counts, sums and star
+        counts to the rating aggregates, committed together, so a failure later in the stream never leaves
+        committed reviews uncounted.
+        """
+        result = BulkResult()
+        ratings: Dict[int, Rating] = {}
+        batch = []
+        try:
+            async for row, record in records:
+                batch.append((row, record))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    await self._import_review_batch(batch, ratings, result)
+                    batch = []
+            if batch:
+                await self._import_review_batch(batch, ratings, result)
+        finally:
+            # Publish every committed batch, even when the stream failed
+            if ratings:
+                book_service = BookService(self.db)
+                await set_ratings(list(ratings.values()))
+                await book_service._invalidate_book_caches(ratings.keys())
+                book_service._schedule_books_cache_invalidation()
         
-        return review
\ No newline at end of file
+        result.errors.sort(key=lambda error: error.row)
+        result.failed = len(result.errors)
+        return result
+    
+    async def _import_review_batch(
+        self, batch: List[Tuple[int, Record]], ratings: Dict[int, Rating], result: BulkResult
+    ):
+        """Validate, check book ids, insert and add to the aggregates for one batch of import rows"""
+        valid = []
+        for row, record in batch:
+            if isinstance(record, Exception):
+                result.errors.append(BulkRowError(row=row, errors=[str(record)]))
+                continue
+            try:
+                valid.append((row, ReviewImport.model_validate(record)))
+            except ValidationError as e:
+                result.errors.append(BulkRowError(row=row, errors=format_validation_errors(e)))
+        
+        book_ids = {review.book_id for _, review in valid}
+        known_ids = set()
+        if book_ids:
+            known_ids = set(await self.db.scalars(select(Book.id).where(Book.id.in_(book_ids))))
+        
+        rows = []
+        for row, review in valid:
+            if review.book_id in known_ids:
+                rows.append(review.model_dump())
+            else:
+                result.errors.append(BulkRowError(
+                    row=row, errors=[f"Book with id {review.book_id} not found"]
+                ))
+        if not rows:
+            return
+        
+        await self.db.execute(insert(Review), rows)
+        batch_ratings = await BookService(self.db).add_ratings((row["book_id"], row["rating"]) for row in rows)
+        await self.db.commit()
+        result.created += len(rows)
+        ratings.update((rating[0], rating) for rating in batch_ratings)
+
+
+def _select_reviews(fields: Fields):
+    """SELECT of reviews loading only the requested columns, plus the cursor's created_at and id"""
+    query = select(Review)
+    if fields:
+        query = query.options(load_only(Review.created_at, *(getattr(Review, name) for name in fields)))
+    return query
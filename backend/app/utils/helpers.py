@@ -1,6 +1,14 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+import base64
 import json
+import orjson
 from datetime import datetime
+from pydantic import BaseModel, ValidationError
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Schema field names of a sparse fieldset; None means every field
+Fields = Optional[Tuple[str, ...]]
 
 
 def serialize_datetime(obj: Any) -> str:
@@ -16,4 +24,63 @@ def clean_dict_for_cache(data: Dict[str, Any]) -> Dict[str, Any]:
     for key, value in data.items():
         if not key.startswith('_'):
             cleaned[key] = value
-    return cleaned
\ No newline at end of file
+    return cleaned
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset pagination values into an opaque cursor string"""
+    raw = json.dumps(values, default=serialize_datetime, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def construct_model(model: Type[ModelT], obj: Any, fields: Fields = None) -> ModelT:
+    """Build a schema instance from trusted ORM attributes without validation.
+    
+    With fields, only those attributes are read, so columns left unloaded
+    by load_only are never fetched.
+    """
+    return model.model_construct(**{name: getattr(obj, name) for name in fields or model.model_fields})
+
+
+def dump_json(model: BaseModel, exclude: Optional[Dict[str, Any]] = None) -> bytes:
+    """Serialize a schema instance to JSON bytes"""
+    return orjson.dumps(model.model_dump(exclude=exclude))
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Fields:
+    """Fields named by a comma-separated fields= parameter, in schema order so equal sets share cache keys"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("No fields given")
+    unknown = requested - model.model_fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in model.model_fields if name in requested)
+
+
+def sparse_exclude(list_field: str, model: Type[BaseModel], fields: Fields) -> Optional[Dict[str, Any]]:
+    """dump_json exclude keeping only the given fields of each item in list_field"""
+    if fields is None:
+        return None
+    return {list_field: {"__all__": model.model_fields.keys() - set(fields)}}
+
+
+def format_validation_errors(exc: ValidationError) -> List[str]:
+    """Flatten a pydantic ValidationError into "field: message" strings"""
+    return [
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    ]
@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+from app.config import settings
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong entity tag over the values a representation is derived from"""
+    digest = hashlib.blake2b(":".join(str(part) for part in parts).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag of a compressed variant; strong ETags differ per content coding"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def cache_control() -> str:
+    return (
+        f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+
+
+class Validators:
+    """ETag and Last-Modified of one representation, checked before its body is built"""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime] = None):
+        self.etag = etag
+        self.matched_etag: Optional[str] = None
+        # Timestamps are stored as naive UTC; HTTP dates have whole seconds
+        self.last_modified = (
+            last_modified.replace(tzinfo=timezone.utc, microsecond=0) if last_modified else None
+        )
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control()}
+        if self.last_modified:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's copy is current; If-None-Match wins over If-Modified-Since"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            for tag in if_none_match.split(","):
+                # GET uses the weak comparison, so W/ copies from a CDN still match
+                tag = tag.strip().removeprefix("W/")
+                if tag == "*" or _identity_etag(tag) == self.etag:
+                    self.matched_etag = self.etag if tag == "*" else tag
+                    return True
+            return False
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return self.last_modified <= since
+
+    def not_modified(self) -> Response:
+        """Empty 304 naming the variant the client holds, compressed or not"""
+        headers = self.headers()
+        headers["ETag"] = self.matched_etag or self.etag
+        return Response(status_code=304, headers=headers)
+
+
+def _identity_etag(tag: str) -> str:
+    """Strip the content coding added by variant_etag"""
+    base, _, encoding = tag[:-1].rpartition("-")
+    return f'{base}"' if base and encoding in ("gzip", "br") else tag
@@ -0,0 +1,138 @@
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type, Union
+import csv
+import io
+import json
+import orjson
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# A parsed input row, or the reason it could not be parsed
+Record = Union[Dict[str, Any], ValueError]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Union[str, ValueError]]:
+    """Split a byte stream into decoded lines without buffering the whole body.
+    
+    Lines that are not valid UTF-8 come through as a ValueError, so one
+    bad row is reported instead of failing the upload.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield _decode_line(line)
+    if pending:
+        yield _decode_line(pending)
+
+
+def _decode_line(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError:
+        return ValueError("Invalid UTF-8")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    """Yield (row number, record) for each non-blank NDJSON line"""
+    row = 0
+    async for line in iter_lines(chunks):
+        row += 1
+        if isinstance(line, ValueError):
+            yield row, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row, ValueError("Invalid JSON")
+            continue
+        if not isinstance(record, dict):
+            yield row, ValueError("Row must be a JSON object")
+            continue
+        yield row, record
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    """Yield (row number, record) for each CSV data row; the first row is the header.
+    
+    Empty cells become None so optional fields stay unset.
+    """
+    header: List[str] = []
+    row = 0
+    pending = ""
+    async for line in iter_lines(chunks):
+        if isinstance(line, ValueError):
+            # Drops any quoted field the line belonged to
+            pending = ""
+            row += 1
+            yield row, line
+            continue
+        # A quoted field may span lines; wait until its quotes are balanced
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if not header:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row, {name: value if value != "" else None for name, value in zip(header, values)}
+    if pending:
+        yield row + 1, ValueError("Unterminated quoted field")
+
+
+def iter_records(chunks: AsyncIterator[bytes], content_type: str) -> AsyncIterator[Tuple[int, Record]]:
+    """Pick a parser from the request content type; NDJSON unless it says CSV"""
+    if "csv" in (content_type or ""):
+        return iter_csv(chunks)
+    return iter_ndjson(chunks)
+
+
+async def encode_ndjson(partitions: AsyncIterator[List[BaseModel]]) -> AsyncIterator[bytes]:
+    """Encode each partition of models as one chunk of NDJSON lines"""
+    async for partition in partitions:
+        if partition:
+            yield b"".join(orjson.dumps(item.model_dump()) + b"\n" for item in partition)
+
+
+async def encode_csv(
+    partitions: AsyncIterator[List[BaseModel]], model: Type[BaseModel]
+) -> AsyncIterator[bytes]:
+    """Encode a header row, then each partition of models as one chunk of CSV rows"""
+    fields = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for partition in partitions:
+        for item in partition:
+            values = item.model_dump(mode="json")
+            writer.writerow([values[field] for field in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    partitions: AsyncIterator[List[BaseModel]], export_format: str, model: Type[BaseModel], filename: str
+) -> StreamingResponse:
+    """Stream partitions of models as an NDJSON or CSV download"""
+    if export_format == "csv":
+        body, media_type = encode_csv(partitions, model), "text/csv"
+    else:
+        body, media_type = encode_ndjson(partitions), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,110 @@
+"""Concurrency benchmark: sync Session vs AsyncSession inside async handlers.
+
+Simulates N parallel clients hitting a DB-bound handler. Each handler runs a
+query that takes ``--delay-ms`` inside the database (a registered SQLite
+``bench_sleep`` function stands in for a slow query), then loads a book.
+
+    python -m benchmarks.async_db --clients 100 --requests 5 --delay-ms 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.models import Base, Book
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("bench_sleep", 1, _sleep_ms)
+
+
+def _seed(url: str):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(Book(title="Benchmark Book", author="Benchmark Author"))
+        db.commit()
+    engine.dispose()
+
+
+async def run_sync(url: str, clients: int, requests: int, delay_ms: int) -> float:
+    """Old path: blocking Session calls from inside coroutines"""
+    engine = create_engine(url, pool_size=clients, max_overflow=0)
+    event.listen(engine, "connect", _register_sleep)
+    Session = sessionmaker(bind=engine)
+
+    async def handler():
+        with Session() as db:
+            db.execute(text("SELECT bench_sleep(:ms)"), {"ms": delay_ms})
+            db.execute(select(Book).where(Book.id == 1)).scalars().first()
+
+    async def client():
+        for _ in range(requests):
+            await handler()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+async def run_async(url: str, clients: int, requests: int, delay_ms: int) -> float:
+    """New path: AsyncSession, the event loop is free while queries run"""
+    from app.database import get_async_url
+    from app.services.book_service import BookService
+
+    engine = create_async_engine(
+        get_async_url(url), poolclass=AsyncAdaptedQueuePool, pool_size=clients, max_overflow=0
+    )
+    event.listen(engine.sync_engine, "connect", _register_sleep)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def handler():
+        async with Session() as db:
+            await db.execute(text("SELECT bench_sleep(:ms)"), {"ms": delay_ms})
+            await BookService(db).get_book_by_id(1)
+
+    async def client():
+        for _ in range(requests):
+            await handler()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--delay-ms", type=int, default=20, help="simulated query time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        _seed(url)
+        total = args.clients * args.requests
+
+        print(f"{args.clients} clients x {args.requests} requests, {args.delay_ms} ms per query")
+        print(f"{'mode':<8}{'seconds':>10}{'req/s':>10}")
+        for mode, runner in (("sync", run_sync), ("async", run_async)):
+            elapsed = asyncio.run(runner(url, args.clients, args.requests, args.delay_ms))
+            print(f"{mode:<8}{elapsed:>10.2f}{total / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
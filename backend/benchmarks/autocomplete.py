@@ -0,0 +1,82 @@
+"""Benchmark: in-memory prefix index for title/author autocomplete.
+
+Builds a PrefixIndex from synthetic books, then reports build time, memory,
+lookup latency percentiles for random 1-4 character prefixes and the time
+to add a bulk import's worth of books to the full index.
+
+    python -m benchmarks.autocomplete --books 1000000 --lookups 20000
+"""
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+from app.autocomplete import PrefixIndex
+
+WORDS = [
+    "the", "of", "night", "dragon", "garden", "river", "house", "shadow", "winter",
+    "storm", "last", "silent", "empire", "journey", "secret", "city", "stone", "song",
+]
+
+
+def _books(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    for book_id in range(1, count + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+        author = f"{rng.choice(string.ascii_uppercase)}. {''.join(rng.choices(string.ascii_lowercase, k=7)).title()}"
+        yield book_id, f"{title} {book_id}", author
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--bulk", type=int, default=20_000, help="books added at once after the build")
+    args = parser.parse_args()
+
+    books = list(_books(args.books + args.bulk))
+    books, bulk = books[:args.books], books[args.books:]
+    index = PrefixIndex(max_entries=(args.books + args.bulk) * 2)
+    start = time.perf_counter()
+    index.build(books)
+    build_seconds = time.perf_counter() - start
+
+    # Measured on a second build, tracemalloc slows building down a lot
+    tracemalloc.start()
+    measured = PrefixIndex(max_entries=(args.books + args.bulk) * 2)
+    measured.build(books)
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    tracemalloc.stop()
+    del measured
+
+    rng = random.Random(7)
+    prefixes = [
+        rng.choice(WORDS + [c for c in string.ascii_lowercase])[: rng.randint(1, 4)]
+        for _ in range(args.lookups)
+    ]
+    samples = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.search(prefix, args.limit)
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    entries = len(index)
+    start = time.perf_counter()
+    index.add_many(bulk)
+    bulk_seconds = time.perf_counter() - start
+
+    print(f"{args.books} books, {entries} entries, built in {build_seconds:.1f} s, {memory_mb:.0f} MB")
+    print(f"lookup us: p50 {_percentile(samples, 50):.1f}  p99 {_percentile(samples, 99):.1f}  "
+          f"max {max(samples):.1f}")
+    print(f"added {args.bulk} books in {bulk_seconds:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
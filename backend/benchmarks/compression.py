@@ -0,0 +1,75 @@
+"""Bytes on the wire and server CPU per request for each content coding.
+
+Runs against an in-process app on a seeded catalog, so CPU time is the
+whole request (routing, cache, serialization and compression) as seen by
+one worker.
+
+    python -m benchmarks.compression --requests 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from benchmarks.seed import seed_catalog
+
+PATHS = {
+    "GET /books/ (cached page)": "/books/?per_page=100",
+    "GET /books/{book_id}/reviews": "/books/{popular}/reviews?per_page=100",
+    "GET /books/export": "/books/export",
+}
+
+
+async def measure(requests: int, warmup: int):
+    import fakeredis.aioredis
+    import httpx
+    from app import cache
+    from app.compression import ENCODINGS
+    from app.main import app
+
+    print(f"{'endpoint':<32}{'coding':>10}{'bytes':>12}{'ratio':>8}{'cpu µs':>10}")
+    with patch.object(cache.redis, "from_url", lambda _url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs)):
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                books = (await client.get("/books/", params={"per_page": 100})).json()["books"]
+                popular = max(books, key=lambda book: book["review_count"])["id"]
+                for name, path in PATHS.items():
+                    path = path.format(popular=popular)
+                    identity_size = None
+                    for encoding in ("identity",) + tuple(reversed(ENCODINGS)):
+                        headers = {"Accept-Encoding": encoding}
+                        for _ in range(warmup):
+                            await client.get(path, headers=headers)
+                        size = 0
+                        start = time.process_time()
+                        for _ in range(requests):
+                            async with client.stream("GET", path, headers=headers) as response:
+                                async for chunk in response.aiter_raw():
+                                    size += len(chunk)
+                        cpu = (time.process_time() - start) / requests
+                        size //= requests
+                        identity_size = identity_size or size
+                        print(f"{name:<32}{encoding:>10}{size:>12}{identity_size / size:>7.1f}x{cpu * 1e6:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint and coding")
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_catalog(url, books=1000, reviews=10_000)
+        # Settings are read at import time, so configure before importing the app
+        os.environ["DATABASE_URL"] = url
+        os.environ["REDIS_URL"] = "redis://in-process"
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        asyncio.run(measure(args.requests, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
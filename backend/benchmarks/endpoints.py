@@ -0,0 +1,395 @@
+"""Endpoint benchmark: every route of app.main:app, driven in-process.
+
+Seeds (or reuses) a SQLite catalog, swaps Redis for an in-process fakeredis
+server, runs the app lifespan and sends requests through httpx's ASGI
+transport. Latency percentiles and throughput per endpoint are written to a
+JSON file; pass --baseline to compare against an earlier run.
+
+    python -m benchmarks.endpoints --books 10000 --reviews 100000 --out bench.json
+    python -m benchmarks.endpoints --baseline bench-main.json --max-regression 20
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from benchmarks.seed import WORDS, seed_catalog
+
+
+@dataclass
+class Context:
+    """State shared by request builders"""
+    rng: random.Random
+    books: int
+    popular: List[int]
+    serial: count = field(default_factory=lambda: count(1))
+
+    def book_id(self) -> int:
+        return self.rng.randint(1, self.books)
+
+    def popular_id(self) -> int:
+        return self.rng.choice(self.popular)
+
+    def word(self) -> str:
+        return self.rng.choice(WORDS)
+
+
+@dataclass
+class Endpoint:
+    """One benchmarked request shape for a route"""
+    name: str
+    method: str
+    route: str
+    build: Callable[[Context], Dict[str, Any]]
+    status: int = 200
+    # Caps heavy requests such as full exports
+    max_requests: Optional[int] = None
+
+
+def _new_book(ctx: Context) -> dict:
+    n = next(ctx.serial)
+    return {
+        "title": f"{ctx.word().capitalize()} {ctx.word()} {n}",
+        "author": f"Bench Author {n % 100}",
+        "isbn": f"{9_000_000_000_000 + n}",
+        "published_year": 2000,
+    }
+
+
+def _new_review(ctx: Context) -> dict:
+    return {"reviewer_name": "Bench Reader", "rating": ctx.rng.randint(1, 5), "comment": ctx.word()}
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def _cursor(ctx: Context) -> str:
+    from app.utils.helpers import encode_cursor
+    return encode_cursor({"id": ctx.rng.randint(0, ctx.books)})
+
+
+SPARSE_BOOK_FIELDS = "id,title,author,average_rating"
+# The debug endpoints need the profile token outside DEBUG
+PROFILE_TOKEN = "benchmark"
+PROFILE_HEADERS = {"X-Profile-Token": PROFILE_TOKEN}
+RECENT = (datetime(2024, 1, 1) - timedelta(days=1)).isoformat()
+
+ENDPOINTS = [
+    Endpoint("GET /", "GET", "/", lambda ctx: {"url": "/"}),
+    Endpoint("GET /health", "GET", "/health", lambda ctx: {"url": "/health"}),
+    Endpoint("GET /cache/stats", "GET", "/cache/stats", lambda ctx: {"url": "/cache/stats"}),
+    Endpoint("GET /metrics", "GET", "/metrics", lambda ctx: {"url": "/metrics"}),
+    Endpoint(
+        "GET /debug/queries", "GET", "/debug/queries",
+        lambda ctx: {"url": "/debug/queries", "headers": PROFILE_HEADERS},
+    ),
+    Endpoint(
+        "DELETE /debug/queries", "DELETE", "/debug/queries",
+        lambda ctx: {"url": "/debug/queries", "headers": PROFILE_HEADERS}, status=204,
+    ),
+    Endpoint(
+        "GET /books/ page", "GET", "/books/",
+        lambda ctx: {"url": "/books/", "params": {"page": ctx.rng.randint(1, 20)}},
+    ),
+    Endpoint(
+        "GET /books/ cursor", "GET", "/books/",
+        lambda ctx: {"url": "/books/", "params": {"cursor": _cursor(ctx)}},
+    ),
+    Endpoint(
+        "GET /books/ cursor sparse", "GET", "/books/",
+        lambda ctx: {"url": "/books/", "params": {"cursor": _cursor(ctx), "fields": SPARSE_BOOK_FIELDS}},
+    ),
+    Endpoint(
+        "GET /books/search", "GET", "/books/search",
+        lambda ctx: {"url": "/books/search", "params": {"q": f"{ctx.word()} {ctx.word()}", "per_page": 20}},
+    ),
+    Endpoint(
+        "GET /books/autocomplete", "GET", "/books/autocomplete",
+        lambda ctx: {"url": "/books/autocomplete", "params": {"prefix": ctx.word()[:3]}},
+    ),
+    Endpoint(
+        "GET /books/top", "GET", "/books/top",
+        lambda ctx: {"url": "/books/top", "params": {"min_reviews": ctx.rng.choice([1, 5, 10, 50])}},
+    ),
+    Endpoint(
+        "GET /books/batch", "GET", "/books/batch",
+        lambda ctx: {"url": "/books/batch", "params": {"ids": ",".join(str(ctx.book_id()) for _ in range(50))}},
+    ),
+    Endpoint(
+        "POST /books/batch", "POST", "/books/batch",
+        lambda ctx: {"url": "/books/batch", "json": {"ids": [ctx.book_id() for _ in range(50)]}},
+    ),
+    Endpoint(
+        "GET /books/export incremental", "GET", "/books/export",
+        lambda ctx: {"url": "/books/export", "params": {"updated_since": RECENT}},
+    ),
+    Endpoint(
+        "GET /books/export full", "GET", "/books/export",
+        lambda ctx: {"url": "/books/export"}, max_requests=3,
+    ),
+    Endpoint(
+        "GET /books/{book_id}", "GET", "/books/{book_id}",
+        lambda ctx: {"url": f"/books/{ctx.book_id()}"},
+    ),
+    Endpoint(
+        "GET /books/{book_id}/stats", "GET", "/books/{book_id}/stats",
+        lambda ctx: {"url": f"/books/{ctx.popular_id()}/stats"},
+    ),
+    Endpoint(
+        "GET /books/{book_id}/reviews page", "GET", "/books/{book_id}/reviews",
+        lambda ctx: {"url": f"/books/{ctx.popular_id()}/reviews", "params": {"page": ctx.rng.randint(1, 5)}},
+    ),
+    Endpoint(
+        "GET /books/{book_id}/reviews cursor", "GET", "/books/{book_id}/reviews",
+        lambda ctx: {"url": f"/books/{ctx.popular_id()}/reviews", "params": {"cursor": ""}},
+    ),
+    Endpoint(
+        "GET /books/{book_id}/reviews/export", "GET", "/books/{book_id}/reviews/export",
+        lambda ctx: {"url": f"/books/{ctx.popular_id()}/reviews/export"},
+    ),
+    # Writes run last so they do not change what the reads measure
+    Endpoint(
+        "POST /books/", "POST", "/books/",
+        lambda ctx: {"url": "/books/", "json": _new_book(ctx)}, status=201,
+    ),
+    Endpoint(
+        "POST /books/bulk", "POST", "/books/bulk",
+        lambda ctx: {
+            "url": "/books/bulk",
+            "content": _ndjson(_new_book(ctx) for _ in range(100)),
+            "headers": {"content-type": "application/x-ndjson"},
+        },
+    ),
+    Endpoint(
+        "POST /books/{book_id}/reviews", "POST", "/books/{book_id}/reviews",
+        lambda ctx: {"url": f"/books/{ctx.popular_id()}/reviews", "json": _new_review(ctx)}, status=201,
+    ),
+    Endpoint(
+        "POST /reviews/bulk", "POST", "/reviews/bulk",
+        lambda ctx: {
+            "url": "/reviews/bulk",
+            "content": _ndjson({**_new_review(ctx), "book_id": ctx.book_id()} for _ in range(100)),
+            "headers": {"content-type": "application/x-ndjson"},
+        },
+    ),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def uncovered_routes(app) -> List[str]:
+    """App routes with no benchmark endpoint"""
+    from fastapi.routing import APIRoute
+
+    covered = {(endpoint.method, endpoint.route) for endpoint in ENDPOINTS}
+    return sorted(
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in route.methods
+        if (method, route.path) not in covered
+    )
+
+
+async def bench_endpoint(client, endpoint: Endpoint, ctx: Context, requests: int, concurrency: int, warmup: int):
+    """Send requests for one endpoint from concurrent workers"""
+    if endpoint.max_requests is not None:
+        requests = min(requests, endpoint.max_requests)
+        warmup = min(warmup, 1)
+    for _ in range(warmup):
+        await client.request(endpoint.method, **endpoint.build(ctx))
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            kwargs = endpoint.build(ctx)
+            start = time.perf_counter()
+            response = await client.request(endpoint.method, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != endpoint.status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "method": endpoint.method,
+        "route": endpoint.route,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _popular_books(url: str, limit: int = 100) -> List[int]:
+    from sqlalchemy import create_engine, select
+    from app.models import Book
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        ids = conn.execute(
+            select(Book.id).where(Book.review_count > 0).order_by(Book.review_count.desc()).limit(limit)
+        ).scalars().all()
+    engine.dispose()
+    return list(ids) or [1]
+
+
+async def run(args, url: str) -> dict:
+    """Start the app with an in-process Redis and benchmark every endpoint"""
+    import fakeredis.aioredis
+    import httpx
+    from app import cache
+    from app.main import app
+
+    ctx = Context(rng=random.Random(args.seed), books=args.books, popular=_popular_books(url))
+    selected = [endpoint for endpoint in ENDPOINTS if not args.only or args.only in endpoint.name]
+    results = {}
+
+    with patch.object(cache.redis, "from_url", lambda _url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs)):
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                for endpoint in selected:
+                    results[endpoint.name] = await bench_endpoint(
+                        client, endpoint, ctx, args.requests, args.concurrency, args.warmup
+                    )
+                    _print_row(endpoint.name, results[endpoint.name])
+
+    return {"endpoints": results, "uncovered": uncovered_routes(app)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_row(name: str, result: dict, baseline: Optional[dict] = None):
+    row = (
+        f"{name:<40}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+        f"{result['p99_ms']:>9.2f}{result['throughput_rps']:>10.1f}{result['errors']:>7}"
+    )
+    if baseline:
+        row += f"{_change(baseline['p95_ms'], result['p95_ms']):>10}{_change(baseline['throughput_rps'], result['throughput_rps']):>10}"
+    print(row)
+
+
+def _change(old: float, new: float) -> str:
+    return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+
+def compare(report: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+    """Print p95 and throughput changes; False when p95 regressed too much"""
+    print(f"\nvs baseline {baseline['meta'].get('commit')}")
+    print(f"{'endpoint':<40}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'errors':>7}{'p95':>10}{'req/s':>10}")
+    ok = True
+    for name, result in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        _print_row(name, result, before)
+        if before and max_regression is not None and before["p95_ms"]:
+            if (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 > max_regression:
+                ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--reviews", type=int, default=100_000)
+    parser.add_argument("--skew", type=float, default=1.2, help="Pareto shape of reviews per book")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per endpoint")
+    parser.add_argument("--only", help="only endpoints whose name contains this")
+    parser.add_argument("--db", help="seeded SQLite file to reuse (default: cached in the temp dir)")
+    parser.add_argument("--reseed", action="store_true", help="seed again even if --db exists")
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare with")
+    parser.add_argument("--max-regression", type=float, help="fail when any p95 grows by more than this percent")
+    args = parser.parse_args()
+
+    seeded = args.db or os.path.join(
+        tempfile.gettempdir(), f"book-review-bench-{args.books}-{args.reviews}-{args.skew}-{args.seed}.db"
+    )
+    if args.reseed or not os.path.exists(seeded):
+        start = time.perf_counter()
+        seed_catalog(f"sqlite:///{seeded}.tmp", args.books, args.reviews, args.skew, args.seed)
+        os.replace(f"{seeded}.tmp", seeded)
+        print(f"seeded {args.books} books, {args.reviews} reviews in {time.perf_counter() - start:.1f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Writes during the run must not leak into the next run
+        working = os.path.join(tmp, "bench.db")
+        shutil.copy(seeded, working)
+        url = f"sqlite:///{working}"
+        # Settings are read at import time, so configure before importing the app
+        os.environ["DATABASE_URL"] = url
+        os.environ["REDIS_URL"] = "redis://in-process"
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        os.environ["PROFILE_TOKEN"] = PROFILE_TOKEN
+
+        print(f"{'endpoint':<40}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'errors':>7}")
+        report = asyncio.run(run(args, url))
+
+    report["meta"] = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "books": args.books,
+        "reviews": args.reviews,
+        "skew": args.skew,
+        "seed": args.seed,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"results written to {args.out}")
+    for route in report["uncovered"]:
+        print(f"warning: no benchmark endpoint for {route}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(report, baseline, args.max_regression):
+            sys.exit(f"p95 regressed by more than {args.max_regression}%")
+
+
+if __name__ == "__main__":
+    main()
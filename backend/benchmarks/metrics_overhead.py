@@ -0,0 +1,142 @@
+"""Overhead of the /metrics instrumentation (route middleware, engine events, cache timers).
+
+Comparing whole requests with metrics off and on drowns a few microseconds
+in run-to-run noise, so this times each instrumentation hook on its own,
+counts how often a request hits each hook (from the metrics themselves) and
+relates the resulting cost to the request's measured latency.
+
+    python -m benchmarks.metrics_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from benchmarks.seed import seed_catalog
+
+PATHS = {
+    "GET /health": "/health",
+    "GET /books/{book_id} (cache hit)": "/books/1",
+    "GET /books/{book_id}/reviews (DB)": "/books/1/reviews",
+}
+
+
+def _per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+async def _per_call_async(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - start) / iterations
+
+
+async def hook_costs(iterations: int) -> dict:
+    """Seconds added by each instrumentation hook per call"""
+    from app.metrics import MetricsMiddleware, _after_cursor_execute, _before_cursor_execute, time_cache
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "route": SimpleNamespace(path="/books/{book_id}")}
+    middleware = MetricsMiddleware(endpoint)
+    bare = await _per_call_async(lambda: endpoint(scope, None, send), iterations)
+    wrapped = await _per_call_async(lambda: middleware(scope, None, send), iterations)
+
+    context = SimpleNamespace()
+    statement = "SELECT books.id FROM books WHERE books.id = ?"
+
+    def query_hooks():
+        _before_cursor_execute(None, None, statement, (), context, False)
+        _after_cursor_execute(None, None, statement, (), context, False)
+
+    def cache_timer():
+        with time_cache("get"):
+            pass
+
+    return {
+        "request": wrapped - bare,
+        "query": _per_call(query_hooks, iterations),
+        "cache": _per_call(cache_timer, iterations),
+    }
+
+
+async def measure(requests: int, warmup: int, iterations: int):
+    import fakeredis.aioredis
+    import httpx
+    from prometheus_client import REGISTRY
+    from app import cache
+    from app.main import app
+
+    def total(name):
+        return sum(
+            sample.value
+            for metric in REGISTRY.collect()
+            for sample in metric.samples
+            if sample.name == name
+        )
+
+    costs = await hook_costs(iterations)
+    print(
+        f"hook cost: {costs['request'] * 1e6:.2f} µs per request, "
+        f"{costs['query'] * 1e6:.2f} µs per query, {costs['cache'] * 1e6:.2f} µs per Redis call"
+    )
+    print(f"{'endpoint':<36}{'p50 µs':>10}{'queries':>9}{'redis':>7}{'added µs':>10}{'overhead':>10}")
+
+    with patch.object(cache.redis, "from_url", lambda _url, **kwargs: fakeredis.aioredis.FakeRedis(**kwargs)):
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, path in PATHS.items():
+                    for _ in range(warmup):
+                        await client.get(path)
+                    queries = total("db_queries_total")
+                    redis_calls = total("cache_operation_duration_seconds_count")
+                    latencies = []
+                    for _ in range(requests):
+                        start = time.perf_counter()
+                        await client.get(path)
+                        latencies.append(time.perf_counter() - start)
+                    queries = (total("db_queries_total") - queries) / requests
+                    redis_calls = (total("cache_operation_duration_seconds_count") - redis_calls) / requests
+
+                    p50 = statistics.median(latencies)
+                    added = costs["request"] + queries * costs["query"] + redis_calls * costs["cache"]
+                    print(
+                        f"{name:<36}{p50 * 1e6:>10.1f}{queries:>9.1f}{redis_calls:>7.1f}"
+                        f"{added * 1e6:>10.2f}{added / p50 * 100:>9.2f}%"
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=100_000, help="calls per hook timing")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_catalog(url, books=1000, reviews=10_000)
+        # Settings are read at import time, so configure before importing the app
+        os.environ["DATABASE_URL"] = url
+        os.environ["REDIS_URL"] = "redis://in-process"
+        os.environ["METRICS_ENABLED"] = "true"
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        asyncio.run(measure(args.requests, args.warmup, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Seed a reproducible catalog for benchmarks.
+
+Books get spread-out ``updated_at`` values so incremental exports have work to
+do. Review counts follow a Pareto distribution over a shuffled popularity
+ranking: a few books collect most reviews and the long tail has none.
+
+    python -m benchmarks.seed --books 1000000 --reviews 5000000 --db bench.db
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, create_engine, func, insert, select, update
+
+from app.models import Base, Book, Review
+from app.models.book import STAR_BUCKETS, star_bucket_clause
+
+SEED_BATCH_SIZE = 10_000
+WORDS = (
+    "shadow river garden empire silent winter glass midnight ocean forgotten "
+    "kingdom paper iron golden secret storm city last letter wild"
+).split()
+
+
+def _book_rows(rng: random.Random, count: int, now: datetime):
+    for i in range(1, count + 1):
+        title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4)))
+        yield {
+            "title": title,
+            "author": f"Author {rng.randint(1, max(1, count // 20))}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(30)),
+            "isbn": f"{i:013d}",
+            "published_year": rng.randint(1900, now.year),
+            "average_rating": 0.0,
+            "review_count": 0,
+            "rating_sum": 0.0,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+        }
+
+
+def _review_rows(rng: random.Random, books: int, count: int, skew: float, now: datetime):
+    # Popularity rank -> book id, so popular books are spread over the id range
+    ranking = list(range(1, books + 1))
+    rng.shuffle(ranking)
+    for i in range(count):
+        rank = min(books, int(rng.paretovariate(skew)))
+        yield {
+            "book_id": ranking[rank - 1],
+            "reviewer_name": f"Reader {rng.randint(1, 100_000)}",
+            "rating": rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 5, 4))[0],
+            "comment": " ".join(rng.choice(WORDS) for _ in range(12)),
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now - timedelta(seconds=i),
+        }
+
+
+def _insert_batches(conn, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_SIZE:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+
+def seed_catalog(url: str, books: int, reviews: int, skew: float = 1.2, seed: int = 42):
+    """Create the schema at url and fill it with a deterministic catalog"""
+    rng = random.Random(seed)
+    # Fixed clock so the same seed always produces the same rows
+    now = datetime(2024, 1, 1)
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        _insert_batches(conn, Book, _book_rows(rng, books, now))
+        _insert_batches(conn, Review, _review_rows(rng, books, reviews, skew, now))
+
+        # Fill the rating aggregates the API keeps up to date on writes
+        stats = (
+            select(
+                Review.book_id,
+                func.count(Review.id).label("review_count"),
+                func.sum(Review.rating).label("rating_sum"),
+                *(
+                    func.sum(case((star_bucket_clause(Review.rating) == stars, 1), else_=0)).label(f"stars_{stars}")
+                    for stars in STAR_BUCKETS
+                ),
+            )
+            .group_by(Review.book_id)
+            .subquery()
+        )
+        conn.execute(
+            update(Book)
+            .where(Book.id == stats.c.book_id)
+            .values(
+                review_count=stats.c.review_count,
+                rating_sum=stats.c.rating_sum,
+                average_rating=func.round(stats.c.rating_sum * 1.0 / stats.c.review_count, 2),
+                **{f"stars_{stars}": stats.c[f"stars_{stars}"] for stars in STAR_BUCKETS},
+            )
+        )
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--reviews", type=int, default=100_000)
+    parser.add_argument("--skew", type=float, default=1.2, help="Pareto shape of reviews per book")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default="bench.db", help="SQLite file to create")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed_catalog(f"sqlite:///{args.db}", args.books, args.reviews, args.skew, args.seed)
+    print(f"seeded {args.books} books, {args.reviews} reviews in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
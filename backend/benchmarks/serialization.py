@@ -0,0 +1,103 @@
+"""Micro-benchmark: cached book list page, old path vs pre-serialized bytes.
+
+Old hit:  json.loads -> BookList(**data) -> response_model validation -> json.dumps
+New hit:  stored bytes returned as-is in a raw Response
+Old miss: BookList(books=orm_rows) validation -> dict for cache -> json.dumps
+New miss: model_construct from ORM rows -> orjson
+
+    python -m benchmarks.serialization --per-page 50 --iterations 2000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.models import Book
+from app.schemas.book import BookList, BookResponse
+from app.utils.helpers import construct_model, dump_json
+
+
+def _make_books(count: int):
+    now = datetime.utcnow()
+    return [
+        Book(
+            id=i,
+            title=f"Benchmark Book {i}",
+            author=f"Benchmark Author {i}",
+            description="A long description of the book. " * 20,
+            isbn=f"{i:013d}",
+            published_year=2000,
+            average_rating=4.2,
+            review_count=10,
+            rating_sum=42.0,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def _respond_like_fastapi(model: BookList) -> Response:
+    """What FastAPI does with a returned model and response_model=BookList"""
+    validated = BookList.model_validate(model.model_dump())
+    return Response(json.dumps(jsonable_encoder(validated)), media_type="application/json")
+
+
+def _measure(fn, iterations: int):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (
+        (time.perf_counter() - wall) / iterations * 1e6,
+        (time.process_time() - cpu) / iterations * 1e6,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    books = _make_books(args.per_page)
+    page = {"total": 10_000, "page": 1, "per_page": args.per_page}
+
+    old_cached = json.dumps(
+        {"books": [BookResponse.model_validate(book).model_dump() for book in books], **page},
+        default=str,
+    )
+    new_cached = dump_json(
+        BookList.model_construct(books=[construct_model(BookResponse, b) for b in books], **page)
+    )
+
+    def old_hit():
+        _respond_like_fastapi(BookList(**json.loads(old_cached)))
+
+    def new_hit():
+        return Response(new_cached, media_type="application/json")
+
+    def old_miss():
+        result = BookList(books=books, **page)
+        json.dumps({"books": [b.__dict__ for b in result.books], **page}, default=str)
+        _respond_like_fastapi(result)
+
+    def new_miss():
+        content = dump_json(BookList.model_construct(
+            books=[construct_model(BookResponse, b) for b in books], **page
+        ))
+        return Response(content, media_type="application/json")
+
+    print(f"{args.per_page} books per page, {args.iterations} iterations")
+    print(f"{'path':<10}{'wall us':>10}{'cpu us':>10}")
+    for name, fn in (("old hit", old_hit), ("new hit", new_hit),
+                     ("old miss", old_miss), ("new miss", new_miss)):
+        wall, cpu = _measure(fn, args.iterations)
+        print(f"{name:<10}{wall:>10.1f}{cpu:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,50 @@
+import os
 import pytest
 import asyncio
+import tempfile
+import fakeredis
+import fakeredis.aioredis
+from unittest.mock import patch
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+# ✅ Settings are read at import time, so provide local defaults first; the
+# SQLite file lives outside the source tree and is removed after the run
+_database_dir = tempfile.TemporaryDirectory(prefix="book-review-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_database_dir.name, 'test.db')}")
+os.environ.setdefault("REDIS_URL", "redis://fakeredis")  # every test gets its own, see fake_redis
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
 
 from app.main import app
-from app.database import get_db, Base
+from app.database import get_db, get_async_db, get_async_url, make_sessionmaker, Base
+from app import cache
 from app.cache import init_cache
+from app.leaderboard import local_leaderboard
+from app.metrics import instrument_engine
+from app.profiling import track_statements
+from app.query_stats import track_query_stats
 from app.models import book, review  # Ensure models are registered
 
-# ✅ Use appropriate PostgreSQL URL
-SQLALCHEMY_DATABASE_URL = (
-    "test_database_url"
-)
+# ✅ Use the configured URL (SQLite file locally, PostgreSQL in CI)
+SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
 
-# ✅ Correct engine config for PostgreSQL (no SQLite-specific settings)
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# ✅ NullPool so connections never outlive the TestClient event loop
+async_engine = create_async_engine(get_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+
+TestingAsyncSessionLocal = make_sessionmaker(async_engine)
+
+# ✅ Instrumented like the app engine, so DB metrics are observable
+instrument_engine(async_engine.sync_engine, "test")
+track_statements(async_engine.sync_engine)
+track_query_stats(async_engine.sync_engine)
+
 # ✅ Dependency override
 def override_get_db():
     try:
@@ -28,7 +54,29 @@ def override_get_db():
         db.close()
 
 
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+
+
+# ✅ A fresh in-process Redis per test, so cached books, generations and
+# leaderboard keys never outlive the rows they were built from
+@pytest.fixture(autouse=True)
+def fake_redis():
+    """Point every Redis client the app creates at this test's own server"""
+    server = fakeredis.FakeServer()
+
+    def from_url(url, **kwargs):
+        return fakeredis.aioredis.FakeRedis(server=server, **kwargs)
+
+    with patch.object(cache.redis, "from_url", from_url):
+        yield server
+    cache.local_cache.clear()
+    local_leaderboard.clear()
 
 
 # ✅ Sync fixture since TestClient is sync
@@ -58,6 +106,20 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def book_queries():
+    """SELECT statements against books run while the test is active; clear() to start counting"""
+    statements = []
+
+    def count_book_queries(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "FROM books" in statement:
+            statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_book_queries)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", count_book_queries)
+
+
 @pytest.fixture
 def sample_book_data():
     """Sample book data for testing"""
@@ -0,0 +1,35 @@
+from app.autocomplete import BISECT_INSERT_LIMIT, PrefixIndex
+
+
+def _books(start: int, count: int):
+    return [(book_id, f"Title {book_id:05d}", f"Author {book_id % 7}") for book_id in range(start, start + count)]
+
+
+def test_add_many_matches_one_by_one_inserts():
+    """Test that merged batches and single inserts give the same sorted, duplicate-free index"""
+    books = _books(1, 200)
+    merged = PrefixIndex(max_entries=1000)
+    merged.build(books[:50])
+    merged.add_many(books[50:])
+    merged.add_many(books[100:150])  # a broadcast applied again
+
+    single = PrefixIndex(max_entries=1000)
+    for book in books:
+        single.add(*book)
+
+    assert len(books[50:]) > BISECT_INSERT_LIMIT
+    assert merged._entries == single._entries == sorted(single._entries)
+    assert len(merged) == 200 + 7
+    assert [entry[2] for entry in merged.search("author 3", limit=5)] == ["Author 3"]
+
+
+def test_full_index_does_not_record_dropped_authors():
+    """Test that authors whose entries did not fit can still be indexed once there is room"""
+    index = PrefixIndex(max_entries=3)
+    index.add_many([(1, "First", "Ann"), (2, "Second", "Bob")])
+    assert len(index) == 3
+    assert index.search("bob") == []
+
+    index.max_entries = 10
+    index.add(3, "Third", "Bob")
+    assert [entry[2] for entry in index.search("bob")] == ["Bob"]
@@ -1,6 +1,18 @@
+import asyncio
+import csv
+import io
+import json
 import pytest
+import httpx
+from datetime import datetime
+from unittest.mock import patch
 from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database import get_async_db
 from app.models.book import Book
+from app.services.book_service import BookService
+from tests.conftest import TestingAsyncSessionLocal
 
 
 @pytest.mark.asyncio
@@ -56,6 +68,18 @@ def test_create_book_invalid_isbn(client: TestClient):
     assert response.status_code == 422
 
 
+def test_create_book_future_published_year(client: TestClient, sample_book_data):
+    """Test that published_year is bounded by the year at validation time"""
+    next_year = datetime.now().year + 1
+    response = client.post("/books/", json={**sample_book_data, "published_year": next_year})
+    assert response.status_code == 422
+
+    with patch("app.schemas.book.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(next_year, 1, 1)
+        response = client.post("/books/", json={**sample_book_data, "published_year": next_year})
+    assert response.status_code == 201
+
+
 def test_get_book_not_found(client: TestClient):
     """Test getting a non-existent book"""
     response = client.get("/books/999")
@@ -74,4 +98,250 @@ async def test_get_book_by_id(client: TestClient, sample_book_data):
     assert response.status_code == 200
     data = response.json()
     assert data["id"] == book_id
-    assert data["title"] == sample_book_data["title"]
\ No newline at end of file
+    assert data["title"] == sample_book_data["title"]
+
+def test_get_books_cursor_pagination(client: TestClient):
+    """Test walking all books with keyset pagination"""
+    for i in range(1, 6):
+        client.post("/books/", json={"title": f"Book {i}", "author": f"Author {i}"})
+    
+    response = client.get("/books/?cursor=&per_page=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] is None
+    titles = [book["title"] for book in data["books"]]
+    
+    while data["next_cursor"]:
+        response = client.get(f"/books/?cursor={data['next_cursor']}&per_page=2")
+        assert response.status_code == 200
+        data = response.json()
+        titles.extend(book["title"] for book in data["books"])
+    
+    assert titles == [f"Book {i}" for i in range(1, 6)]
+
+
+def test_get_books_invalid_cursor(client: TestClient):
+    """Test that a malformed cursor is rejected"""
+    response = client.get("/books/?cursor=not-a-cursor")
+    assert response.status_code == 422
+
+
+def test_get_book_cold_key_single_query(client: TestClient, sample_book_data, book_queries):
+    """Test that concurrent requests for an uncached book share one query"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    
+    async def get_concurrently():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+            return await asyncio.gather(*(
+                async_client.get(f"/books/{book_id}") for _ in range(100)
+            ))
+    
+    book_queries.clear()
+    # On the app's loop, where its Redis clients were created
+    responses = client.portal.call(get_concurrently)
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert len(book_queries) == 1
+
+
+def test_bulk_import_books_ndjson(client: TestClient, sample_book_data):
+    """Test NDJSON bulk import with a per-row error report"""
+    client.post("/books/", json=sample_book_data)
+    
+    body = "\n".join([
+        '{"title": "Bulk 1", "author": "Author", "isbn": "1111111111"}',
+        '{"title": "Bulk 2", "author": "Author", "published_year": 2001}',
+        '{"title": "", "author": "Author"}',
+        'not json',
+        '{"title": "Bulk 3", "author": "Author", "isbn": "1111111111"}',
+        f'{{"title": "Bulk 4", "author": "Author", "isbn": "{sample_book_data["isbn"]}"}}',
+    ])
+    response = client.post(
+        "/books/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["failed"] == 4
+    assert [error["row"] for error in data["errors"]] == [3, 4, 5, 6]
+    assert client.get("/books/").json()["total"] == 3
+
+
+def test_bulk_import_books_invalid_utf8(client: TestClient):
+    """Test that an undecodable line is a row error, not a failed upload"""
+    body = b'{"title": "Good", "author": "Author"}\n{"title": "\xff\xfe", "author": "Author"}\n'
+    response = client.post("/books/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["errors"] == [{"row": 2, "errors": ["Invalid UTF-8"]}]
+
+
+def test_bulk_import_books_failure_keeps_committed_batches_visible(client: TestClient):
+    """Test that books committed before a failing row reach the list cache and autocomplete"""
+    client.get("/books/")  # caches the empty first page
+    
+    async def records():
+        for row in range(1, 4):
+            yield row, {"title": f"Bulk {row}", "author": "Author"}
+        raise ConnectionError("client disconnected")
+    
+    async def import_books():
+        async with TestingAsyncSessionLocal() as db:
+            await BookService(db).import_books(records())
+    
+    with patch("app.services.book_service.BULK_BATCH_SIZE", 2), \
+         patch("app.services.book_service.add_to_autocomplete") as mock_autocomplete:
+        with pytest.raises(ConnectionError):
+            client.portal.call(import_books)
+    
+    mock_autocomplete.assert_called_once()
+    assert [title for _, title, _ in mock_autocomplete.call_args.args[0]] == ["Bulk 1", "Bulk 2"]
+    assert client.get("/books/").json()["total"] == 2
+
+
+def test_bulk_import_books_csv(client: TestClient):
+    """Test CSV bulk import, including quoted multi-line fields"""
+    body = (
+        "title,author,description,isbn,published_year\n"
+        'CSV 1,Author,"Line one\nLine two",2222222222,1999\n'
+        "CSV 2,Author,,,\n"
+        "CSV 3,Author,,,not-a-year\n"
+    )
+    response = client.post("/books/bulk", content=body, headers={"Content-Type": "text/csv"})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["errors"][0]["row"] == 3
+    
+    books = client.get("/books/").json()["books"]
+    assert books[0]["description"] == "Line one\nLine two"
+    assert books[1]["isbn"] is None
+
+
+def test_export_books_ndjson(client: TestClient):
+    """Test streaming the catalog as NDJSON with an updated_since filter"""
+    for i in range(1, 4):
+        client.post("/books/", json={"title": f"Book {i}", "author": "Author"})
+    
+    response = client.get("/books/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    books = [json.loads(line) for line in response.text.splitlines()]
+    assert [book["title"] for book in books] == ["Book 1", "Book 2", "Book 3"]
+    
+    since = books[2]["updated_at"]
+    response = client.get("/books/export", params={"updated_since": since})
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Book 3"]
+
+
+def test_export_books_csv(client: TestClient, sample_book_data):
+    """Test streaming the catalog as CSV"""
+    client.post("/books/", json=sample_book_data)
+    
+    response = client.get("/books/export?format=csv")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["isbn"] == sample_book_data["isbn"]
+
+
+def test_search_books(client: TestClient):
+    """Test full-text search ranks title matches above description matches"""
+    client.post("/books/", json={
+        "title": "Cooking Basics", "author": "Chef", "description": "Recipes about dragons"
+    })
+    client.post("/books/", json={
+        "title": "Dragons of Autumn", "author": "Weis", "description": "An epic fantasy"
+    })
+    client.post("/books/", json={"title": "Gardening", "author": "Green"})
+    
+    response = client.get("/books/search", params={"q": "dragon"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert [book["title"] for book in data["books"]] == ["Dragons of Autumn", "Cooking Basics"]
+    
+    response = client.get("/books/search", params={"q": 'weis"*'})
+    assert [book["title"] for book in response.json()["books"]] == ["Dragons of Autumn"]
+
+
+def test_autocomplete_books(client: TestClient):
+    """Test title and author prefix suggestions, including bulk-imported books"""
+    client.post("/books/", json={"title": "The Hobbit", "author": "J.R.R. Tolkien"})
+    client.post("/books/", json={"title": "The Hunger Games", "author": "Suzanne Collins"})
+    client.post(
+        "/books/bulk",
+        content='{"title": "Tolkien: A Biography", "author": "Humphrey Carpenter"}',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    
+    response = client.get("/books/autocomplete", params={"prefix": "the h"})
+    assert response.status_code == 200
+    assert [s["text"] for s in response.json()] == ["The Hobbit", "The Hunger Games"]
+    
+    suggestions = client.get("/books/autocomplete", params={"prefix": "TOLK"}).json()
+    assert [(s["text"], s["field"]) for s in suggestions] == [("Tolkien: A Biography", "title")]
+    
+    def no_database():
+        raise AssertionError("autocomplete opened a database session")
+    
+    with patch.dict(app.dependency_overrides, {get_async_db: no_database}):
+        suggestions = client.get("/books/autocomplete", params={"prefix": "j.r.r"}).json()
+    assert [(s["text"], s["field"]) for s in suggestions] == [("J.R.R. Tolkien", "author")]
+
+
+def test_get_books_batch(client: TestClient, book_queries):
+    """Test batch lookups keep request order and report missing ids"""
+    ids = [client.post("/books/", json={"title": f"Book {i}", "author": "A"}).json()["id"] for i in range(3)]
+    
+    response = client.get("/books/batch", params={"ids": f"{ids[2]},999,{ids[0]},{ids[2]}"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [book["id"] for book in data["books"]] == [ids[2], ids[0]]
+    assert data["missing"] == [999]
+    
+    book_queries.clear()
+    # One IN query for the misses; the ids cached above cost nothing
+    response = client.post("/books/batch", json={"ids": [ids[1], ids[0], ids[2]]})
+    assert len(book_queries) == 1
+    response = client.post("/books/batch", json={"ids": [ids[0], ids[1]]})
+    assert len(book_queries) == 1
+    assert [book["title"] for book in response.json()["books"]] == ["Book 0", "Book 1"]
+    
+    assert client.get("/books/batch", params={"ids": "1,x"}).status_code == 422
+    assert client.get("/books/batch", params={"ids": ","}).status_code == 422
+    assert client.post("/books/batch", json={"ids": list(range(101))}).status_code == 422
+
+
+def test_get_books_sparse_fields(client: TestClient, sample_book_data, book_queries):
+    """Test that fields= loads and returns only the requested columns"""
+    for i in range(3):
+        client.post("/books/", json={**sample_book_data, "title": f"Book {i}", "isbn": None})
+    full = client.get("/books/").json()
+    
+    book_queries.clear()
+    response = client.get("/books/", params={"fields": "title, id,average_rating"})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["books"] == [
+        {"id": book["id"], "title": book["title"], "average_rating": book["average_rating"]}
+        for book in full["books"]
+    ]
+    assert data["total"] == 3
+    assert not any("books.description" in statement for statement in book_queries)
+    # Same field set in another order shares the cached page and its ETag
+    same = client.get("/books/", params={"fields": "average_rating,id,title"})
+    assert same.headers["etag"] == response.headers["etag"] != client.get("/books/").headers["etag"]
+    
+    data = client.get("/books/", params={"fields": "title", "cursor": "", "per_page": 2}).json()
+    assert data["books"] == [{"title": "Book 0"}, {"title": "Book 1"}]
+    data = client.get("/books/", params={"fields": "title", "cursor": data["next_cursor"]}).json()
+    assert data["books"] == [{"title": "Book 2"}]
+    
+    assert client.get("/books/", params={"fields": "title,rating_sum"}).status_code == 422
+    assert client.get("/books/", params={"fields": ","}).status_code == 422
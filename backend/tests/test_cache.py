@@ -0,0 +1,104 @@
+import pytest
+import fakeredis.aioredis
+from unittest.mock import patch
+
+from app.cache import (
+    LocalCache, _apply_invalidation, delete_cache, get_cache_many, get_or_load, get_versions, local_cache,
+    set_cache_unless_invalidated
+)
+
+
+def test_local_cache_evicts_least_recently_used():
+    """Test that the local tier stays within its size bound"""
+    cache = LocalCache(max_items=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_local_cache_expires_entries():
+    """Test that local entries expire after their TTL"""
+    cache = LocalCache(max_items=10, ttl=60)
+    with patch("app.cache.time.monotonic", return_value=1000.0):
+        cache.set("a", 1, ttl=5)
+    with patch("app.cache.time.monotonic", return_value=1004.0):
+        assert cache.get("a") == 1
+    with patch("app.cache.time.monotonic", return_value=1006.0):
+        assert cache.get("a") is None
+
+
+def test_invalidation_message_drops_namespace():
+    """Test that a broadcast namespace invalidation clears local copies"""
+    local_cache.clear()
+    local_cache.set("books:generation", 3)
+    local_cache.set("books:gen:3:page:1:per_page:50", {"books": []})
+    local_cache.set("other:key", 1)
+    
+    _apply_invalidation({"namespace": "books"})
+    
+    assert local_cache.get("books:generation") is None
+    assert local_cache.get("books:gen:3:page:1:per_page:50") is None
+    assert local_cache.get("other:key") == 1
+    local_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_and_set_cache_many():
+    """Test multi-key reads in key order across the local and Redis tiers"""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    local_cache.clear()
+    with patch("app.cache.redis_client", redis_client):
+        assert await set_cache_unless_invalidated({"a": {"id": 1}, "b": {"id": 2}}, versions={})
+        local_cache.delete("b")
+        assert await get_cache_many(["b", "missing", "a"]) == [{"id": 2}, None, {"id": 1}]
+        assert local_cache.get("b") == {"id": 2}
+    assert await redis_client.ttl("a") > 0
+    local_cache.clear()
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_skips_values_invalidated_during_the_load():
+    """Test that a delete racing a load keeps the pre-write value out of both tiers"""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    local_cache.clear()
+    loads = []
+    
+    async def load_then_write():
+        loads.append(1)
+        value = {"average_rating": 1.0}  # read before the writer commits
+        if len(loads) == 1:
+            await delete_cache("book:1")  # the writer's invalidation lands mid-load
+        return value
+    
+    with patch("app.cache.redis_client", redis_client):
+        assert await get_or_load("book:1", load_then_write) == {"average_rating": 1.0}
+        assert local_cache.get("book:1") is None
+        assert await redis_client.exists("book:1") == 0
+        
+        await get_or_load("book:1", load_then_write)
+        assert len(loads) == 2
+        assert local_cache.get("book:1") == {"average_rating": 1.0}
+        assert await redis_client.exists("book:1") == 1
+    local_cache.clear()
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_set_cache_unless_invalidated_skips_only_moved_keys():
+    """Test that a batch fill keeps out just the keys deleted since their versions were read"""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    local_cache.clear()
+    with patch("app.cache.redis_client", redis_client):
+        versions = dict(zip(["a", "b"], await get_versions(["a", "b"])))
+        await delete_cache("b")
+        assert not await set_cache_unless_invalidated({"a": {"id": 1}, "b": {"id": 2}}, versions)
+        assert await get_cache_many(["a", "b"]) == [{"id": 1}, None]
+    local_cache.clear()
+    await redis_client.aclose()
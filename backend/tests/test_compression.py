@@ -0,0 +1,82 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.compression import ENCODINGS, brotli, compress, negotiate
+
+
+def test_negotiate_accept_encoding():
+    """Test q-values, wildcards and server preference in coding negotiation"""
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == ENCODINGS[0]
+    assert negotiate("GZIP;q=0.5, deflate") == "gzip"
+    if brotli is not None:
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("gzip;q=1.0, br;q=0.8") == "gzip"
+
+
+def _create_books(client: TestClient, sample_book_data, count: int):
+    for i in range(count):
+        client.post("/books/", json={**sample_book_data, "title": f"Book {i}", "isbn": None})
+
+
+def test_book_list_served_compressed_from_cache(client: TestClient, sample_book_data):
+    """Test that a list page is compressed once and later hits reuse the cached bytes"""
+    _create_books(client, sample_book_data, 10)
+
+    with patch("app.services.book_service.compress", wraps=compress) as mock_compress:
+        first = client.get("/books/", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/books/", headers={"Accept-Encoding": "gzip"})
+
+    assert mock_compress.call_count == 1
+    for response in (first, second):
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert len(response.json()["books"]) == 10
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["etag"].endswith('-gzip"')
+
+    identity = client.get("/books/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.json() == first.json()
+    assert first.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+
+
+def test_variant_etag_revalidates(client: TestClient, sample_book_data):
+    """Test that the compressed variant's ETag gets a 304 naming that variant"""
+    _create_books(client, sample_book_data, 10)
+    etag = client.get("/books/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+    response = client.get("/books/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_small_and_streamed_responses(client: TestClient, sample_book_data):
+    """Test that small bodies pass through and streamed exports are compressed"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+
+    response = client.get(f"/books/{book_id}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    _create_books(client, sample_book_data, 20)
+    with client.stream("GET", "/books/export", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        body = gzip.decompress(b"".join(response.iter_raw()))
+    assert len(body.splitlines()) == 21
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli not installed")
+def test_brotli_list_page(client: TestClient, sample_book_data):
+    """Test that brotli is preferred when the client accepts it"""
+    _create_books(client, sample_book_data, 10)
+    response = client.get("/books/", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert len(response.json()["books"]) == 10
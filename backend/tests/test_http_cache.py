@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from app.config import settings
+
+
+def test_book_etag_and_last_modified(client: TestClient, sample_book_data):
+    """Test conditional GETs of a single book and revalidation after a review"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+
+    response = client.get(f"/books/{book_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response.headers["cache-control"] == (
+        f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, "
+        f"stale-while-revalidate={settings.HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+    )
+
+    response = client.get(f"/books/{book_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(f"/books/{book_id}", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(f"/books/{book_id}", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(f"/books/{book_id}", headers={"If-Modified-Since": "garbage"}).status_code == 200
+
+    client.post(f"/books/{book_id}/reviews", json={"reviewer_name": "R", "rating": 4.0})
+    response = client.get(f"/books/{book_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["review_count"] == 1
+    assert response.headers["etag"] != etag
+
+
+def test_book_list_etag(client: TestClient, sample_book_data):
+    """Test that list ETags depend on the page and change when the catalog does"""
+    client.post("/books/", json=sample_book_data)
+
+    response = client.get("/books/")
+    etag = response.headers["etag"]
+    assert client.get("/books/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/books/?page=2", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/books/?cursor=", headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/books/", json={**sample_book_data, "title": "Another", "isbn": None})
+    response = client.get("/books/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+
+
+def test_review_list_etag(client: TestClient, sample_book_data, sample_review_data):
+    """Test that a new review changes the review list ETag"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    client.post(f"/books/{book_id}/reviews", json=sample_review_data)
+
+    response = client.get(f"/books/{book_id}/reviews")
+    etag = response.headers["etag"]
+    assert client.get(f"/books/{book_id}/reviews", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"/books/{book_id}/reviews", json=sample_review_data)
+    response = client.get(f"/books/{book_id}/reviews", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
@@ -9,14 +9,14 @@ async def test_books_cache_miss_flow(client: TestClient, sample_book_data):
     """Test that cache miss flows correctly fetch from DB and set cache"""
     
     # Mock cache to simulate cache miss
-    with patch('app.cache.get_cache', return_value=None) as mock_get_cache, \
-         patch('app.cache.set_cache', return_value=True) as mock_set_cache:
+    with patch('app.services.book_service.get_cache', return_value=None) as mock_get_cache, \
+         patch('app.services.book_service.set_cache', return_value=True) as mock_set_cache:
         
         # Create a book first
         client.post("/books/", json=sample_book_data)
         
-        # Get books - should trigger cache miss
-        response = client.get("/books/")
+        # Get books - should trigger cache miss; identity skips the compressed variant lookup
+        response = client.get("/books/", headers={"Accept-Encoding": "identity"})
         
         assert response.status_code == 200
         data = response.json()
@@ -138,4 +138,23 @@ async def test_error_handling(client: TestClient):
     }
     
     response3 = client.post(f"/books/{book_id}/reviews", json=invalid_review)
-    assert response3.status_code == 422
\ No newline at end of file
+    assert response3.status_code == 422
+
+@pytest.mark.asyncio
+async def test_books_cache_generation_invalidation(client: TestClient, sample_book_data):
+    """Test that writes invalidate every list page with one generation bump"""
+    
+    with patch('app.services.book_service.get_generation', return_value=7) as mock_generation, \
+         patch('app.services.book_service.bump_generation', return_value=True) as mock_bump, \
+         patch('app.services.book_service.set_cache', return_value=True) as mock_set_cache:
+        
+        client.post("/books/", json=sample_book_data)
+        mock_bump.assert_called_once_with("books")
+        
+        # Any page and page size is keyed by the current generation
+        mock_generation.reset_mock()
+        client.get("/books/?page=12&per_page=7")
+        cache_key = mock_set_cache.call_args[0][0]
+        assert cache_key == "books:gen:7:page:12:per_page:7"
+        # The ETag and the cached page share one generation read
+        mock_generation.assert_called_once_with("books")
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+
+from app.jobs import JobQueue
+from app.metrics import JOB_RUNS
+
+
+@pytest.mark.asyncio
+async def test_burst_of_submits_coalesces_into_one_run():
+    """Test that keys submitted within the window share a single run"""
+    runs = []
+    
+    async def handler(keys):
+        runs.append(keys)
+    
+    queue = JobQueue(window=0.05)
+    queue.register("coalesce", handler)
+    for i in range(500):
+        queue.submit("coalesce", i % 10)
+    assert queue.depth("coalesce") == 10
+    
+    await asyncio.sleep(0.2)
+    assert runs == [set(range(10))]
+    assert queue.depth("coalesce") == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_runs_pending_work_immediately():
+    """Test that flush skips the window and waits for the run"""
+    runs = []
+    
+    async def handler(keys):
+        runs.append(keys)
+    
+    queue = JobQueue(window=60)
+    queue.register("flush", handler)
+    queue.submit("flush", "a", "b")
+    await asyncio.wait_for(queue.flush(), 1)
+    assert runs == [{"a", "b"}]
+
+
+@pytest.mark.asyncio
+async def test_failed_run_is_counted_and_later_runs_continue():
+    """Test that a failing handler is counted and does not stop the job"""
+    calls = []
+    
+    async def handler(keys):
+        calls.append(keys)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+    
+    errors = JOB_RUNS.labels("failing", "error")
+    before = errors._value.get()
+    queue = JobQueue(window=0)
+    queue.register("failing", handler)
+    queue.submit("failing", 1)
+    await queue.flush()
+    queue.submit("failing", 2)
+    await queue.flush()
+    
+    assert calls == [{1}, {2}]
+    assert errors._value.get() == before + 1
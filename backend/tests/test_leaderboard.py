@@ -0,0 +1,131 @@
+import random
+import pytest
+import fakeredis
+import fakeredis.aioredis
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app import cache
+from app.leaderboard import (
+    LEADERBOARD_KEY, LocalLeaderboard, local_leaderboard, rebuild_leaderboard, record_rating, top_rated
+)
+
+
+def test_local_leaderboard_ranks_and_filters_by_review_count():
+    """Test ordering, tier filtering and updates of the in-process fallback"""
+    board = LocalLeaderboard()
+    board.update(5, 5.0, 1)  # ignored until built
+    board.begin_build()
+    board.update(1, 9.0, 2)  # kept aside and replayed over the loaded rows
+    board.build([(1, 4.0, 1), (2, 50.0, 10), (3, 4.0, 1), (4, 0.0, 0)])
+
+    assert [book_id for book_id, _ in board.top(min_reviews=1, limit=10)] == [2, 1, 3]
+    assert [book_id for book_id, _ in board.top(min_reviews=2, limit=10)] == [2, 1]
+    assert [book_id for book_id, _ in board.top(min_reviews=10, limit=10)] == [2]
+    assert board.top(min_reviews=1, limit=1) == [(2, 5.0)]
+
+    board.update(3, 10.5, 2)
+    assert board.top(min_reviews=2, limit=10) == [(3, 5.25), (2, 5.0), (1, 4.5)]
+    assert len(board) == 3
+
+    board.clear()
+    board.update(1, 5.0, 1)
+    assert not board.built and len(board) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_leaderboard_converges_whatever_the_update_order():
+    """Test that ZINCRBY deltas applied out of order match a rebuild from the database"""
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    rng = random.Random(7)
+    updates = []
+    for book_id in range(1, 21):
+        rating_sum = 0.0
+        for review_count in range(1, rng.randint(2, 15)):
+            rating = float(rng.randint(1, 5))
+            rating_sum += rating
+            updates.append((book_id, rating, rating_sum, review_count))
+    rng.shuffle(updates)
+
+    with patch.object(cache, "redis_client", redis_client), \
+         patch("app.leaderboard.publish_event", return_value=True):
+        for update in updates:
+            await record_rating(*update)
+
+        final = {}
+        for book_id, _, rating_sum, review_count in updates:
+            if review_count > final.get(book_id, (0, 0))[1]:
+                final[book_id] = (rating_sum, review_count)
+        expected = sorted(
+            ((rating_sum / review_count, book_id) for book_id, (rating_sum, review_count) in final.items()
+             if review_count >= 5),
+            reverse=True,
+        )
+
+        ranked = await top_rated(min_reviews=5, limit=5)
+        assert [book_id for book_id, _ in ranked] == [book_id for _, book_id in expected[:5]]
+        assert [round(value, 6) for _, value in ranked] == [round(value, 6) for value, _ in expected[:5]]
+        assert len(await top_rated(min_reviews=1, limit=100)) == 20
+    await redis_client.aclose()
+
+
+def test_rebuild_replaces_redis_board(client: TestClient, fake_redis, sample_book_data):
+    """Test that a rebuild recomputes the Redis board from the books table"""
+    book_ids = []
+    for i, rating in enumerate([3.0, 5.0, 4.0]):
+        data = {**sample_book_data, "title": f"Book {i}", "isbn": None}
+        book_ids.append(client.post("/books/", json=data).json()["id"])
+        client.post(f"/books/{book_ids[-1]}/reviews", json={"reviewer_name": "R", "rating": rating})
+
+    redis_client = fakeredis.FakeRedis(server=fake_redis, decode_responses=True)
+    redis_client.zadd(LEADERBOARD_KEY.format(tier=1), {"999": 5.0})
+    assert client.portal.call(rebuild_leaderboard, False) is None  # startup keeps an existing board
+    assert redis_client.zscore(LEADERBOARD_KEY.format(tier=1), "999") == 5.0
+
+    assert client.portal.call(rebuild_leaderboard) == 3
+    assert client.portal.call(top_rated, 1, 10) == [(book_ids[1], 5.0), (book_ids[2], 4.0), (book_ids[0], 3.0)]
+    assert redis_client.exists(LEADERBOARD_KEY.format(tier=10)) == 0
+    assert not local_leaderboard.built
+
+
+def test_local_board_is_only_built_while_redis_fails(client: TestClient, sample_book_data):
+    """Test that the in-process fallback is loaded on a failed Redis read and dropped after"""
+    book_ids = []
+    for title, rating in [("Good", 4.0), ("Great", 5.0)]:
+        data = {**sample_book_data, "title": title, "isbn": None}
+        book_ids.append(client.post("/books/", json=data).json()["id"])
+        client.post(f"/books/{book_ids[-1]}/reviews", json={"reviewer_name": "R", "rating": rating})
+    assert [book["title"] for book in client.get("/books/top").json()] == ["Great", "Good"]
+    assert not local_leaderboard.built
+
+    with patch("app.leaderboard._top_rated_from_redis", side_effect=ConnectionError("Redis is down")):
+        assert [book["title"] for book in client.get("/books/top").json()] == ["Great", "Good"]
+        assert len(local_leaderboard) == 2
+
+        # Reviews keep the loaded board current
+        client.post(f"/books/{book_ids[0]}/reviews", json={"reviewer_name": "R", "rating": 5.0})
+        client.post(f"/books/{book_ids[0]}/reviews", json={"reviewer_name": "R", "rating": 5.0})
+        assert [book["title"] for book in client.get("/books/top").json()] == ["Great", "Good"]
+        client.post(f"/books/{book_ids[1]}/reviews", json={"reviewer_name": "R", "rating": 1.0})
+        assert [book["title"] for book in client.get("/books/top").json()] == ["Good", "Great"]
+
+    assert [book["title"] for book in client.get("/books/top").json()] == ["Good", "Great"]
+    assert not local_leaderboard.built
+
+
+def test_top_books_endpoint(client: TestClient, sample_book_data):
+    """Test GET /books/top ordering and the min_reviews filter"""
+    ratings = {"Mixed": [5.0, 1.0], "Great": [5.0], "Good": [4.0, 4.0, 4.0]}
+    for title, book_ratings in ratings.items():
+        data = {**sample_book_data, "title": title, "isbn": None}
+        book_id = client.post("/books/", json=data).json()["id"]
+        for rating in book_ratings:
+            client.post(f"/books/{book_id}/reviews", json={"reviewer_name": "R", "rating": rating})
+
+    response = client.get("/books/top")
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Great", "Good", "Mixed"]
+
+    response = client.get("/books/top", params={"min_reviews": 2, "limit": 1})
+    assert [book["title"] for book in response.json()] == ["Good"]
+    assert client.get("/books/top", params={"min_reviews": 0}).status_code == 422
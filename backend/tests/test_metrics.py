@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.cache import get_cache, local_cache, set_cache
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_endpoint_exposes_route_latency(client: TestClient, sample_book_data):
+    """Test that requests are recorded under their route template"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    before = _sample("http_request_duration_seconds_count", method="GET", route="/books/{book_id}", status="200")
+    
+    client.get(f"/books/{book_id}")
+    client.get("/books/999999")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_requests_in_flight" in response.text
+    assert _sample(
+        "http_request_duration_seconds_count", method="GET", route="/books/{book_id}", status="200"
+    ) == before + 1
+    assert _sample(
+        "http_request_duration_seconds_count", method="GET", route="/books/{book_id}", status="404"
+    ) >= 1
+
+
+def test_metrics_count_db_queries(client: TestClient, sample_book_data):
+    """Test that SQL statements are counted by operation"""
+    selects = _sample("db_queries_total", operation="SELECT")
+    inserts = _sample("db_queries_total", operation="INSERT")
+    
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    client.get(f"/books/{book_id}/reviews")
+    
+    assert _sample("db_queries_total", operation="INSERT") > inserts
+    assert _sample("db_queries_total", operation="SELECT") > selects
+    assert _sample("db_pool_checked_out", engine="test") == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_count_cache_results():
+    """Test that Redis hits, misses and errors are counted"""
+    local_cache.clear()
+    redis_client = AsyncMock()
+    redis_client.get.side_effect = [None, '{"id": 1}', ConnectionError("down")]
+    misses = _sample("cache_operations_total", operation="get", result="miss")
+    hits = _sample("cache_operations_total", operation="get", result="hit")
+    errors = _sample("cache_operations_total", operation="get", result="error")
+    sets = _sample("cache_operation_duration_seconds_count", operation="set")
+    
+    with patch("app.cache.redis_client", redis_client):
+        assert await get_cache("metrics:a") is None
+        assert await get_cache("metrics:b") == {"id": 1}
+        assert await get_cache("metrics:c") is None
+        assert await set_cache("metrics:d", {"id": 2}) is True
+    
+    assert _sample("cache_operations_total", operation="get", result="miss") == misses + 1
+    assert _sample("cache_operations_total", operation="get", result="hit") == hits + 1
+    assert _sample("cache_operations_total", operation="get", result="error") == errors + 1
+    assert _sample("cache_operation_duration_seconds_count", operation="set") == sets + 1
+    local_cache.clear()
@@ -0,0 +1,83 @@
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.jobs import JobQueue
+from app.profiling import RequestProfile, _current_profile
+
+
+def test_profiling_disabled_without_token(client: TestClient):
+    """Test that requests are not profiled outside DEBUG without the header"""
+    with patch("app.profiling.settings.DEBUG", False), \
+         patch("app.profiling.settings.PROFILE_TOKEN", "secret"):
+        response = client.get("/books/", headers={"X-Profile-Token": "wrong"})
+    
+    assert response.status_code == 200
+    assert "x-sql-count" not in response.headers
+
+
+def test_profiling_header_reports_sql(client: TestClient, sample_book_data):
+    """Test that the profile token adds per-request SQL accounting headers"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    
+    with patch("app.profiling.settings.DEBUG", False), \
+         patch("app.profiling.settings.PROFILE_TOKEN", "secret"):
+        response = client.get(f"/books/{book_id}/reviews", headers={"X-Profile-Token": "secret"})
+    
+    assert response.status_code == 200
+    assert int(response.headers["x-sql-count"]) >= 2
+    assert float(response.headers["x-sql-time-ms"]) > 0
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert "reviews" in response.json()
+
+
+def test_profile_query_returns_call_tree(client: TestClient, sample_book_data):
+    """Test that ?profile=1 replaces the response with a profile report"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    
+    with patch("app.profiling.settings.DEBUG", True):
+        response = client.get(f"/books/{book_id}/reviews", params={"profile": 1})
+    
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == 200
+    assert report["sql"]["count"] >= 2
+    assert any("FROM reviews" in statement["sql"] for statement in report["sql"]["statements"])
+    assert report["call_tree"]
+
+
+def test_repeated_selects_flagged_as_n_plus_one():
+    """Test that identical SELECTs within a request are reported"""
+    profile = RequestProfile()
+    book_query = "SELECT books.id FROM books WHERE books.id = ?"
+    profile.record(book_query, 0.001)
+    profile.record("SELECT reviews.id FROM reviews WHERE reviews.book_id = ?", 0.002)
+    profile.record(book_query, 0.001)
+    profile.record("UPDATE books SET review_count = ? WHERE books.id = ?", 0.001)
+    profile.record("UPDATE books SET review_count = ? WHERE books.id = ?", 0.001)
+    
+    assert profile.repeated(threshold=2) == {book_query: 2}
+    assert profile.as_dict()["n_plus_one"] == [{"sql": book_query, "count": 2}]
+    assert profile.repeated(threshold=3) == {}
+
+
+@pytest.mark.asyncio
+async def test_background_jobs_do_not_inherit_request_profile():
+    """Test that jobs submitted while profiling run outside the request's profile"""
+    seen = []
+    
+    async def handler(keys):
+        seen.append(_current_profile.get())
+    
+    queue = JobQueue(window=0)
+    queue.register("detached", handler)
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        queue.submit("detached", 1)
+    finally:
+        _current_profile.reset(token)
+    await queue.flush()
+    
+    assert seen == [None]
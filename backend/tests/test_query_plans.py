@@ -0,0 +1,234 @@
+import json
+import random
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Tuple
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.database import Base
+from app.jobs import job_queue
+from app.leaderboard import load_ratings
+from app.models.book import Book
+from app.models.review import Review
+from app.services.book_service import BookService
+from app.services.review_service import ReviewService
+from tests.conftest import engine, async_engine, TestingAsyncSessionLocal
+
+# Dataset shaped like production: many books, reviews skewed towards a few
+BOOK_COUNT = 5000
+REVIEW_COUNT = 50000
+LARGE_TABLES = {"books", "reviews"}
+NOW = datetime.utcnow()
+
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+# Scans that walk an index, or the rowid when the ORDER BY starts with the primary key
+SQLITE_INDEX_SCAN = re.compile(r"^SCAN \w+ USING (COVERING )?INDEX \w+$")
+ORDER_BY_ID = re.compile(r"ORDER BY (\w+\.)?id\b", re.IGNORECASE)
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+
+
+@dataclass
+class Scenario:
+    """A service call whose statements must all use an index"""
+    name: str
+    run: Callable[[BookService, ReviewService], Awaitable[None]]
+    # Reason the call may scan or sort, when that is inherent to it
+    allow: Optional[str] = None
+
+
+async def _drain(stream):
+    async for _ in stream:
+        pass
+
+
+async def _records(*records):
+    for row, record in enumerate(records, start=1):
+        yield row, record
+
+
+async def _cursor_books(books, reviews):
+    page = await books.get_books_by_cursor("", per_page=50)
+    await books.get_books_by_cursor(page.next_cursor, per_page=50)
+
+
+async def _cursor_reviews(books, reviews):
+    page = await reviews.get_reviews_by_cursor(1, "", per_page=20)
+    await reviews.get_reviews_by_cursor(1, page.next_cursor, per_page=20)
+
+
+async def _top_books(books, reviews):
+    # The ranking comes from Redis; only loading the ranked books touches the database
+    ranked = [(42, 5.0), (7, 4.5), (4999, 4.0), (123456, 3.5)]
+    with patch("app.services.book_service.top_rated", AsyncMock(return_value=ranked)):
+        await books.get_top_books(limit=len(ranked))
+
+
+SCENARIOS = [
+    Scenario("get_book_by_id", lambda books, reviews: books.get_book_by_id(42)),
+    Scenario("get_books_by_ids", lambda books, reviews: books.get_books_by_ids([42, 7, 4999, 123456])),
+    Scenario(
+        "get_books",
+        lambda books, reviews: books.get_books(page=40, per_page=50),
+        allow="OFFSET pages and the total count read every row; cursor pages are the indexed path",
+    ),
+    Scenario("get_books_by_cursor", _cursor_books),
+    Scenario("get_books_validator", lambda books, reviews: books.get_books_validator()),
+    Scenario(
+        "search_books",
+        lambda books, reviews: books.search_books("T1", per_page=20),
+        allow="relevance ordering sorts the matched rows, not the table",
+    ),
+    Scenario(
+        "export_books",
+        lambda books, reviews: _drain(books.export_books()),
+        allow="a full export reads every row by design",
+    ),
+    Scenario(
+        "export_books_updated_since",
+        lambda books, reviews: _drain(books.export_books(updated_since=NOW - timedelta(minutes=10))),
+    ),
+    Scenario(
+        "import_books",
+        lambda books, reviews: books.import_books(_records(
+            {"title": "Plan", "author": "Plan", "isbn": "9999999999999"},
+        )),
+    ),
+    Scenario("add_rating", lambda books, reviews: books.add_rating(1, 4.0)),
+    Scenario("recompute_ratings", lambda books, reviews: books.recompute_ratings([1, 2, 3])),
+    Scenario("update_average_rating", lambda books, reviews: books.update_average_rating(1)),
+    Scenario("rebuild_rating_aggregates", lambda books, reviews: books.rebuild_rating_aggregates()),
+    Scenario("get_top_books", _top_books),
+    Scenario(
+        "load_ratings",
+        lambda books, reviews: load_ratings(books.db),
+        allow="a leaderboard rebuild reads every rated book by design",
+    ),
+    Scenario("get_rating_stats", lambda books, reviews: books.get_rating_stats(1)),
+    Scenario("get_review_by_id", lambda books, reviews: reviews.get_review_by_id(5)),
+    Scenario("get_reviews_by_book", lambda books, reviews: reviews.get_reviews_by_book(1, page=3, per_page=20)),
+    Scenario("get_reviews_by_cursor", _cursor_reviews),
+    Scenario("export_reviews", lambda books, reviews: _drain(reviews.export_reviews(1))),
+    Scenario(
+        "import_reviews",
+        lambda books, reviews: reviews.import_reviews(_records(
+            {"book_id": 2, "reviewer_name": "Plan", "rating": 5},
+        )),
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    """Seed a realistic dataset once for every plan check"""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(13)
+    with engine.begin() as conn:
+        conn.execute(insert(Book), [
+            {
+                "title": f"T{i}",
+                "author": f"A{i % 500}",
+                "isbn": f"{i:013d}",
+                "created_at": NOW,
+                "updated_at": NOW - timedelta(minutes=i),
+                "average_rating": 0.0,
+                "review_count": 0,
+                "rating_sum": 0.0,
+            }
+            for i in range(1, BOOK_COUNT + 1)
+        ])
+        conn.execute(insert(Review), [
+            {
+                "book_id": min(BOOK_COUNT, int(rng.paretovariate(1.2))),
+                "reviewer_name": "reader",
+                "rating": rng.randint(1, 5),
+                "created_at": NOW - timedelta(seconds=i),
+                "updated_at": NOW,
+            }
+            for i in range(REVIEW_COUNT)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+def _statement_violations(conn, statement: str, parameters) -> List[str]:
+    """Full scans of large tables and filesorts in one statement's plan"""
+    violations = []
+    if conn.dialect.name == "postgresql":
+        # An ordered LIMIT is planned as an Index Scan under a Limit node, never a Seq Scan
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", []))
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+                violations.append(f"Seq Scan on {node['Relation Name']}")
+            elif node["Node Type"] in ("Sort", "Incremental Sort"):
+                violations.append(f"{node['Node Type']} on {node.get('Sort Key')}")
+    else:
+        details = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        sorted_by_btree = any(SQLITE_SORT.search(detail) for detail in details)
+        # A scan walking an index in the requested order stops at the LIMIT
+        ordered = "ORDER BY" in statement.upper() and "LIMIT" in statement.upper() and not sorted_by_btree
+        for detail in details:
+            scan = SQLITE_SCAN.match(detail)
+            if scan and scan.group(1) in LARGE_TABLES:
+                in_order = SQLITE_INDEX_SCAN.match(detail) or (
+                    detail == f"SCAN {scan.group(1)}" and ORDER_BY_ID.search(statement)
+                )
+                if not (ordered and in_order):
+                    violations.append(detail)
+            elif SQLITE_SORT.search(detail):
+                violations.append(detail)
+    return violations
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda scenario: scenario.name)
+async def test_query_plan(seeded_db, scenario: Scenario):
+    """Every service query is served by an index unless explicitly allowed"""
+    statements: List[Tuple[str, object]] = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with TestingAsyncSessionLocal() as db:
+            await scenario.run(BookService(db), ReviewService(db))
+            await db.commit()
+            await job_queue.flush()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+    
+    assert statements, f"{scenario.name} issued no queries"
+    
+    async with async_engine.connect() as conn:
+        report = []
+        for statement, parameters in statements:
+            violations = await conn.run_sync(_statement_violations, statement, parameters)
+            if violations:
+                report.append(f"{' '.join(statement.split())}\n    " + "\n    ".join(violations))
+    
+    if scenario.allow:
+        return
+    assert not report, f"{scenario.name} is not index-backed:\n" + "\n".join(report)
+
+
+@pytest.mark.parametrize("statement, flagged", [
+    ("SELECT id FROM books ORDER BY id LIMIT 10", False),
+    ("SELECT id FROM books ORDER BY updated_at, id LIMIT 10", False),
+    ("SELECT id FROM books WHERE published_year = 2000 LIMIT 10", True),
+    ("SELECT id FROM books WHERE published_year = 2000 ORDER BY published_year LIMIT 10", True),
+])
+def test_limit_only_excuses_index_ordered_scans(seeded_db, statement: str, flagged: bool):
+    """A LIMIT excuses a scan only when the scan itself delivers the requested order"""
+    with engine.connect() as conn:
+        assert bool(_statement_violations(conn, statement, ())) == flagged
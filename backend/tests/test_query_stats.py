@@ -0,0 +1,68 @@
+import logging
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.query_stats import QueryStats, fingerprint, query_stats
+
+
+def test_fingerprint_normalizes_literals_and_lists():
+    """Test that one query shape maps to one fingerprint"""
+    assert fingerprint("SELECT * FROM books WHERE id IN (?, ?, ?)") == \
+        fingerprint("SELECT *\n  FROM books WHERE id IN (?)")
+    assert fingerprint("SELECT * FROM books WHERE id = $1::INTEGER LIMIT 10") == \
+        "SELECT * FROM books WHERE id = ?::INTEGER LIMIT ?"
+    assert fingerprint("SELECT * FROM books WHERE title = 'It''s' AND id = :id_1") == \
+        "SELECT * FROM books WHERE title = ? AND id = ?"
+    assert fingerprint("INSERT INTO books (a, b) VALUES (?, ?), (?, ?), (?, ?)") == \
+        "INSERT INTO books (a, b) VALUES (?...)"
+
+
+def test_query_stats_aggregate_and_stay_bounded():
+    """Test aggregation per fingerprint and eviction of the least recently seen"""
+    stats = QueryStats(max_fingerprints=2)
+    stats.record("SELECT * FROM books WHERE id = 1", 0.002, -1)
+    stats.record("SELECT * FROM books WHERE id = 2", 0.004, -1)
+    stats.record("SELECT count(*) FROM books", 0.010, 1)
+    stats.record("SELECT * FROM reviews", 0.001, 3)
+    
+    snapshot = stats.snapshot(sort="total")
+    assert len(stats) == 2
+    assert [entry["fingerprint"] for entry in snapshot] == [
+        "SELECT count(*) FROM books",
+        "SELECT * FROM reviews",
+    ]
+    
+    stats.record("SELECT * FROM books WHERE id = 3", 0.003, -1)
+    stats.record("SELECT * FROM books WHERE id = 4", 0.005, -1)
+    by_calls = stats.snapshot(sort="calls", limit=1)[0]
+    assert by_calls["fingerprint"] == "SELECT * FROM books WHERE id = ?"
+    assert by_calls["calls"] == 2
+    assert by_calls["mean_ms"] == 4.0
+    assert by_calls["max_ms"] == 5.0
+
+
+def test_debug_queries_endpoint(client: TestClient, sample_book_data):
+    """Test that /debug/queries exposes fingerprints in DEBUG only"""
+    with patch("app.profiling.settings.DEBUG", False), \
+         patch("app.profiling.settings.PROFILE_TOKEN", None):
+        assert client.get("/debug/queries").status_code == 404
+    
+    with patch("app.profiling.settings.DEBUG", True):
+        assert client.delete("/debug/queries").status_code == 204
+        client.post("/books/", json=sample_book_data)
+        client.get("/books/")
+        response = client.get("/debug/queries", params={"sort": "calls"})
+    
+    assert response.status_code == 200
+    fingerprints = [entry["fingerprint"] for entry in response.json()["queries"]]
+    assert any("count(*)" in fingerprint and "FROM books" in fingerprint for fingerprint in fingerprints)
+    assert any(fingerprint.startswith("INSERT INTO books") for fingerprint in fingerprints)
+
+
+def test_slow_queries_are_logged(client: TestClient, caplog):
+    """Test that statements over the threshold are logged"""
+    with patch("app.query_stats.settings.SLOW_QUERY_THRESHOLD_MS", 0), \
+         caplog.at_level(logging.WARNING, logger="app.query_stats"):
+        client.get("/books/")
+    
+    assert any("slow query" in record.message for record in caplog.records)
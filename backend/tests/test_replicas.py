@@ -0,0 +1,195 @@
+import asyncio
+import json
+import pytest
+import fakeredis.aioredis
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import cache
+from app.database import ReplicaSet, make_sessionmaker
+from app.jobs import job_queue
+from app.main import app
+from app.models import Base, Book
+from app.schemas.book import BookCreate
+from app.schemas.review import ReviewCreate
+from app.services.book_service import BOOK_CACHE_KEY, BookService
+from app.services.review_service import ReviewService
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """A primary and two replicas as SQLite files, told apart by book 1's title"""
+    urls = {}
+    for name in ("primary", "replica1", "replica2"):
+        url = f"sqlite:///{tmp_path / name}.db"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Book), [{"title": name, "author": "Routing"}])
+        engine.dispose()
+        urls[name] = url
+    return urls
+
+
+def _async_engine(url):
+    return create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+
+
+async def _first_title(book_service: BookService) -> str:
+    return (await book_service.get_books_by_cursor(per_page=1)).books[0].title
+
+
+async def _read_title(session_factory, client=None) -> str:
+    async with session_factory() as db:
+        db.info["client"] = client
+        return await _first_title(BookService(db))
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_replicas(databases):
+    """Test that opted-in reads alternate between replicas"""
+    replicas = ReplicaSet([_async_engine(databases["replica1"]), _async_engine(databases["replica2"])])
+    Session = make_sessionmaker(_async_engine(databases["primary"]), replicas)
+    
+    titles = [await _read_title(Session) for _ in range(4)]
+    
+    assert titles == ["replica2", "replica1", "replica2", "replica1"]
+
+
+@pytest.mark.asyncio
+async def test_writes_and_read_after_write_use_primary(databases):
+    """Test that writes go to the primary and the writing session reads it back"""
+    replicas = ReplicaSet([_async_engine(databases["replica1"])])
+    Session = make_sessionmaker(_async_engine(databases["primary"]), replicas)
+    
+    with patch("app.database.settings.REPLICA_READ_AFTER_WRITE_SECONDS", 0):
+        async with Session() as db:
+            db.info["client"] = "writer"
+            book_service = BookService(db)
+            assert await _first_title(book_service) == "replica1"
+            await book_service.create_book(BookCreate(title="New", author="Routing"))
+            assert await _first_title(book_service) == "primary"
+        
+        # A fresh session reads from the replica again
+        assert await _read_title(Session) == "replica1"
+    
+    # Recent writes keep the writer's new sessions on the primary until replicas catch up
+    with patch("app.database.settings.REPLICA_READ_AFTER_WRITE_SECONDS", 60):
+        assert await _read_title(Session, client="writer") == "primary"
+        # Other clients and untagged sessions keep reading from the replicas
+        assert await _read_title(Session, client="reader") == "replica1"
+        assert await _read_title(Session) == "replica1"
+    
+    for name, expected in (("primary", ["primary", "New"]), ("replica1", ["replica1"])):
+        engine = create_engine(databases[name])
+        with engine.connect() as conn:
+            assert conn.execute(select(Book.title).order_by(Book.id)).scalars().all() == expected
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cache_refills_after_a_write_read_the_primary(databases, fake_redis):
+    """Test that another client refilling the cache right after a write can't cache a lagging replica's row"""
+    replicas = ReplicaSet([_async_engine(databases["replica1"])])
+    Session = make_sessionmaker(_async_engine(databases["primary"]), replicas)
+    
+    with patch.object(cache, "redis_client", fakeredis.aioredis.FakeRedis(server=fake_redis, decode_responses=True)), \
+         patch.object(cache, "binary_client", fakeredis.aioredis.FakeRedis(server=fake_redis)), \
+         patch("app.database.settings.REPLICA_READ_AFTER_WRITE_SECONDS", 60):
+        async with Session() as db:
+            db.info["client"] = "writer"
+            await ReviewService(db).create_review(1, ReviewCreate(reviewer_name="R", rating=4.0))
+        await job_queue.flush()
+        
+        # replica1 never gets the review, like a replica lagging the write
+        async with Session() as db:
+            db.info["client"] = "reader"
+            book_service = BookService(db)
+            batch = await book_service.get_books_by_ids([1])
+            await cache.delete_cache(BOOK_CACHE_KEY.format(book_id=1))
+            book = await book_service.get_book_cached(1)
+            generation, last_modified = await book_service.get_books_validator()
+            page, _ = await book_service.get_books_cached(generation)
+    
+    assert [(book.title, book.review_count) for book in batch.books] == [("primary", 1)]
+    assert (book.title, book.review_count) == ("primary", 1)
+    assert [(book["title"], book["review_count"]) for book in json.loads(page)["books"]] == [("primary", 1)]
+    engine = create_engine(databases["primary"])
+    with engine.connect() as conn:
+        assert last_modified == conn.execute(select(Book.updated_at)).scalar_one()
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_replicas_leave_rotation(databases, tmp_path):
+    """Test that failed health checks remove replicas and fall back to the primary"""
+    broken = _async_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replicas = ReplicaSet([_async_engine(databases["replica1"]), broken])
+    Session = make_sessionmaker(_async_engine(databases["primary"]), replicas)
+    
+    await replicas.check_health()
+    
+    assert replicas.healthy == [replicas.engines[0]]
+    assert {await _read_title(Session) for _ in range(3)} == {"replica1"}
+    
+    replicas.healthy = []
+    assert await _read_title(Session) == "primary"
+
+
+class _HangingEngine:
+    """Stands in for a replica that accepts the TCP connection but never completes the handshake"""
+    
+    url = make_url("postgresql://replica/hanging")
+    
+    @asynccontextmanager
+    async def connect(self):
+        await asyncio.sleep(3600)
+        yield
+
+
+@pytest.mark.asyncio
+async def test_health_check_times_out_hanging_connects(databases):
+    """Test that a replica hanging while connecting is dropped within the timeout"""
+    replicas = ReplicaSet([_async_engine(databases["replica1"]), _HangingEngine()])
+    
+    # Leaves the real replica room to connect on a loaded machine
+    with patch("app.database.settings.REPLICA_HEALTH_CHECK_TIMEOUT", 0.5):
+        await asyncio.wait_for(replicas.check_health(), 5)
+    
+    assert replicas.healthy == [replicas.engines[0]]
+
+
+class _RecordingReplicaSet(ReplicaSet):
+    """Records when the health check loop has finished unwinding and when the engines are disposed"""
+    
+    def __init__(self, engines, events):
+        super().__init__(engines)
+        self.events = events
+    
+    async def run_health_checks(self):
+        try:
+            await asyncio.sleep(3600)
+        finally:
+            await asyncio.sleep(0.01)  # a probe still closing its connection
+            self.events.append("health checks stopped")
+    
+    async def dispose(self):
+        self.events.append("disposed")
+        await super().dispose()
+
+
+def test_shutdown_waits_for_health_checks(databases):
+    """Test that the lifespan awaits the cancelled health check task before disposing the replicas"""
+    events = []
+    replicas = _RecordingReplicaSet([_async_engine(databases["replica1"])], events)
+    
+    with patch("app.main.replicas", replicas):
+        with TestClient(app):
+            pass
+    
+    assert events == ["health checks stopped", "disposed"]
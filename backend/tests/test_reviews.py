@@ -1,6 +1,21 @@
+import asyncio
+import json
 import pytest
+import httpx
+from unittest.mock import patch
+from sqlalchemy import update
 from fastapi.testclient import TestClient
 
+from app import cache
+from app.main import app
+from app.cache import get_generation
+from app.jobs import job_queue
+from app.leaderboard import LEADERBOARD_KEY, REVIEW_COUNTS_KEY
+from app.models.book import Book
+from app.services.book_service import BOOK_CACHE_KEY, BOOKS_CACHE_NAMESPACE, BookService
+from app.services.review_service import ReviewService
+from tests.conftest import TestingAsyncSessionLocal
+
 
 @pytest.mark.asyncio
 async def test_create_review(client: TestClient, sample_book_data, sample_review_data):
@@ -83,3 +98,227 @@ def test_get_reviews_for_nonexistent_book(client: TestClient):
     response = client.get("/books/999/reviews")
     assert response.status_code == 404
 
+
+
+def test_get_reviews_cursor_pagination(client: TestClient, sample_book_data, sample_review_data):
+    """Test walking reviews newest first with keyset pagination"""
+    book_response = client.post("/books/", json=sample_book_data)
+    book_id = book_response.json()["id"]
+    
+    created_ids = []
+    for i in range(5):
+        review = {**sample_review_data, "reviewer_name": f"Reviewer {i}"}
+        created_ids.append(client.post(f"/books/{book_id}/reviews", json=review).json()["id"])
+    
+    response = client.get(f"/books/{book_id}/reviews?per_page=2")
+    data = response.json()
+    assert data["total"] == 5
+    seen_ids = [review["id"] for review in data["reviews"]]
+    
+    while data["next_cursor"]:
+        response = client.get(
+            f"/books/{book_id}/reviews?cursor={data['next_cursor']}&per_page=2&include_total=true"
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 5
+        seen_ids.extend(review["id"] for review in data["reviews"])
+    
+    assert seen_ids == list(reversed(created_ids))
+
+
+def test_get_reviews_sparse_fields(client: TestClient, sample_book_data, sample_review_data):
+    """Test that fields= trims each review and still pages with cursors"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    for i in range(3):
+        client.post(f"/books/{book_id}/reviews", json={**sample_review_data, "reviewer_name": f"Reviewer {i}"})
+    
+    data = client.get(f"/books/{book_id}/reviews", params={"fields": "rating,id", "per_page": 2}).json()
+    assert [set(review) for review in data["reviews"]] == [{"id", "rating"}] * 2
+    assert data["total"] == 3
+    
+    data = client.get(
+        f"/books/{book_id}/reviews", params={"fields": "reviewer_name", "cursor": data["next_cursor"]}
+    ).json()
+    assert data["reviews"] == [{"reviewer_name": "Reviewer 0"}]
+    
+    response = client.get(f"/books/{book_id}/reviews", params={"fields": "rating,secret"})
+    assert response.status_code == 422
+
+
+def test_concurrent_reviews_no_lost_updates(client: TestClient, sample_book_data):
+    """Test that parallel review posts all land in the book's aggregates"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    ratings = [1.0, 2.0, 3.0, 4.0, 5.0] * 4
+    
+    async def post_concurrently():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as async_client:
+            return await asyncio.gather(*(
+                async_client.post(
+                    f"/books/{book_id}/reviews",
+                    json={"reviewer_name": f"Reviewer {i}", "rating": rating}
+                )
+                for i, rating in enumerate(ratings)
+            ))
+    
+    # On the app's loop, where its Redis clients were created
+    responses = client.portal.call(post_concurrently)
+    assert all(response.status_code == 201 for response in responses)
+    
+    data = client.get(f"/books/{book_id}").json()
+    assert data["review_count"] == len(ratings)
+    assert data["average_rating"] == round(sum(ratings) / len(ratings), 1)
+
+
+def test_bulk_import_reviews(client: TestClient, sample_review_data):
+    """Test bulk review import across books with one aggregate pass"""
+    first_id = client.post("/books/", json={"title": "First", "author": "Author"}).json()["id"]
+    second_id = client.post("/books/", json={"title": "Second", "author": "Author"}).json()["id"]
+    
+    rows = [
+        {"book_id": first_id, "reviewer_name": "A", "rating": 5.0},
+        {"book_id": first_id, "reviewer_name": "B", "rating": 4.0},
+        {"book_id": second_id, "reviewer_name": "C", "rating": 2.0},
+        {"book_id": 999, "reviewer_name": "D", "rating": 3.0},
+        {"book_id": second_id, "reviewer_name": "E", "rating": 9.0},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows)
+    response = client.post(
+        "/reviews/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert [error["row"] for error in data["errors"]] == [4, 5]
+    
+    first = client.get(f"/books/{first_id}").json()
+    assert first["review_count"] == 2
+    assert first["average_rating"] == 4.5
+    second = client.get(f"/books/{second_id}").json()
+    assert second["review_count"] == 1
+    assert second["average_rating"] == 2.0
+
+
+def test_bulk_import_reviews_failure_keeps_aggregates(client: TestClient, sample_book_data):
+    """Test that reviews committed before a failing row are already counted"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    client.get(f"/books/{book_id}")  # cached with no reviews
+    
+    async def records():
+        for row, rating in enumerate([5.0, 3.0, 4.0], start=1):
+            yield row, {"book_id": book_id, "reviewer_name": "R", "rating": rating}
+        raise ConnectionError("client disconnected")
+    
+    async def import_reviews():
+        async with TestingAsyncSessionLocal() as db:
+            await ReviewService(db).import_reviews(records())
+    
+    with patch("app.services.review_service.BULK_BATCH_SIZE", 2):
+        with pytest.raises(ConnectionError):
+            client.portal.call(import_reviews)
+    
+    book = client.get(f"/books/{book_id}").json()
+    assert book["review_count"] == 2
+    assert book["average_rating"] == 4.0
+    assert client.get(f"/books/{book_id}/stats").json()["histogram"]["5"] == 1
+
+
+def test_book_stats_histogram(client: TestClient, sample_book_data):
+    """Test the star histogram through single and bulk review writes"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    for rating in [5.0, 4.5, 4.0, 1.0, 1.9]:
+        client.post(f"/books/{book_id}/reviews", json={"reviewer_name": "R", "rating": rating})
+    
+    response = client.get(f"/books/{book_id}/stats")
+    assert response.status_code == 200
+    assert response.json() == {
+        "book_id": book_id,
+        "review_count": 5,
+        "average_rating": 3.3,
+        "histogram": {"1": 2, "2": 0, "3": 0, "4": 2, "5": 1},
+    }
+    assert client.get(f"/books/{book_id}").json()["average_rating"] == 3.3
+    
+    rows = [{"book_id": book_id, "reviewer_name": "B", "rating": rating} for rating in [3.0, 3.5, 2.0]]
+    client.post(
+        "/reviews/bulk",
+        content="\n".join(json.dumps(row) for row in rows),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    data = client.get(f"/books/{book_id}/stats").json()
+    assert data["review_count"] == 8
+    assert data["histogram"] == {"1": 2, "2": 1, "3": 2, "4": 2, "5": 1}
+    assert data["average_rating"] == client.get(f"/books/{book_id}").json()["average_rating"] == 3.1
+    
+    assert client.get("/books/999/stats").status_code == 404
+
+
+def test_rebuild_rating_aggregates(client: TestClient, db_session, sample_book_data):
+    """Test that the rebuild job repairs drifted aggregates and histograms"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    for rating in [5.0, 2.0]:
+        client.post(f"/books/{book_id}/reviews", json={"reviewer_name": "R", "rating": rating})
+    db_session.execute(update(Book).where(Book.id == book_id).values(review_count=7, stars_5=0, stars_3=4))
+    db_session.commit()
+    assert client.get(f"/books/{book_id}").json()["review_count"] == 7  # now cached
+    book_key = BOOK_CACHE_KEY.format(book_id=book_id)
+    assert client.portal.call(cache.redis_client.exists, book_key) == 1
+    
+    async def rebuild():
+        async with TestingAsyncSessionLocal() as db:
+            assert await BookService(db).rebuild_rating_aggregates() == 1
+            return await BookService(db).get_rating_stats(book_id)
+    
+    stats = client.portal.call(rebuild)
+    assert stats.review_count == 2
+    assert stats.average_rating == 3.5
+    assert stats.histogram == {1: 0, 2: 1, 3: 0, 4: 0, 5: 1}
+    assert client.portal.call(cache.redis_client.exists, book_key) == 0
+    assert client.get(f"/books/{book_id}").json()["review_count"] == 2
+
+
+def test_update_average_rating_refreshes_caches(client: TestClient, db_session, sample_book_data):
+    """Test that repairing one book's aggregates drops its cache entry and moves its leaderboard score"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    client.post(f"/books/{book_id}/reviews", json={"reviewer_name": "R", "rating": 4.0})
+    db_session.execute(
+        update(Book).where(Book.id == book_id).values(review_count=3, rating_sum=3.0, average_rating=1.0)
+    )
+    db_session.commit()
+    stale = client.get(f"/books/{book_id}")
+    assert stale.json()["average_rating"] == 1.0
+    book_key = BOOK_CACHE_KEY.format(book_id=book_id)
+    assert client.portal.call(cache.redis_client.exists, book_key) == 1
+    generation = client.portal.call(get_generation, BOOKS_CACHE_NAMESPACE)
+    
+    async def update_average_rating():
+        async with TestingAsyncSessionLocal() as db:
+            await BookService(db).update_average_rating(book_id)
+        await job_queue.flush()
+    
+    client.portal.call(update_average_rating)
+    
+    assert client.portal.call(cache.redis_client.exists, book_key) == 0
+    assert client.portal.call(get_generation, BOOKS_CACHE_NAMESPACE) == generation + 1
+    assert client.portal.call(cache.redis_client.zscore, LEADERBOARD_KEY.format(tier=1), book_id) == 4.0
+    assert client.portal.call(cache.redis_client.hget, REVIEW_COUNTS_KEY, book_id) == "1"
+    
+    response = client.get(f"/books/{book_id}")
+    assert response.json()["average_rating"] == 4.0
+    assert response.headers["etag"] != stale.headers["etag"]
+
+
+def test_export_book_reviews(client: TestClient, sample_book_data, sample_review_data):
+    """Test streaming a book's reviews as NDJSON"""
+    book_id = client.post("/books/", json=sample_book_data).json()["id"]
+    for _ in range(3):
+        client.post(f"/books/{book_id}/reviews", json=sample_review_data)
+    
+    response = client.get(f"/books/{book_id}/reviews/export")
+    assert response.status_code == 200
+    reviews = [json.loads(line) for line in response.text.splitlines()]
+    assert len(reviews) == 3
+    assert all(review["book_id"] == book_id for review in reviews)
+    
+    assert client.get("/books/999/reviews/export").status_code == 404